@@ -0,0 +1,263 @@
+# ==============================================================================
+# PENERAJU PAGE-READING SPEED TEST (BENCHMARK)
+# ==============================================================================
+# This script measures how fast the page-reading part of the scraper is. It
+# does NOT visit the website: it uses the saved example pages that come with
+# the tool ('page_src.html' and 'temp_page.html') plus a few made-up versions
+# of them (a page with fields missing, a robot-check page and an extra-large
+# page), and reads them many times with every page reader.
+#
+# For each page and reader it reports:
+#   - pages per second and milliseconds per page
+#   - the peak memory used by Python while reading one page (memory used
+#     inside the selectolax reader itself is not seen by this measurement)
+#   - how long each field from config.kml takes to find
+#
+# The results can be saved to a JSON file and compared with an earlier run,
+# so a change that makes reading slower is noticed before it is used for real.
+#
+# Examples:
+#     python benchmark.py
+#     python benchmark.py --save before.json
+#     python benchmark.py --compare before.json --threshold 0.15
+# ==============================================================================
+
+# ------------------------------------------------------------------------------
+# 1. IMPORTING REQUIRED TOOLKITS
+# ------------------------------------------------------------------------------
+import argparse     # Helps us read the options typed after the script name
+import json         # Helps us save and load results as JSON files
+import os           # Helps us work with files and folders on your computer
+import platform     # Helps us note which computer/Python the results came from
+import sys          # Helps us report "failed" to other tools when things got slower
+import time         # Helps us measure how long things take
+import tracemalloc  # Helps us measure how much memory Python used
+from extraction import load_config, compile_plan, cut_region, load_page, parse_html, PARSER_BACKENDS
+
+# ------------------------------------------------------------------------------
+# 2. THE TEST PAGES
+# ------------------------------------------------------------------------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_FILES = ("page_src.html", "temp_page.html")
+
+CAPTCHA_PAGE = """<!DOCTYPE html>
+<html><head><title>PENERAJU</title></head>
+<body><div class="container"><h1>Validation request</h1>
+<p>Please complete the security check to access peneraju.org</p>
+<form method="post"><input type="hidden" name="__ncforminfo" value="x"/></form>
+</div></body></html>"""
+
+
+def _without_fields(html):
+    """A copy of a course page where most fields are gone (labels, phone, email)."""
+    return (html.replace('class="label"', 'class="caption"')
+                .replace('ti-headset', 'ti-phone-off')
+                .replace('mailto:', 'contact:'))
+
+
+def _enlarged(html, copies=8):
+    """A copy of a course page with the "More Like This" part repeated many times."""
+    start = html.find('<section id="events">')
+    end = html.find('</section>', start)
+    if start < 0 or end < 0:
+        return html * 2
+    end += len('</section>')
+    return html[:end] + html[start:end] * (copies - 1) + html[end:]
+
+
+def load_fixtures():
+    """Returns the test pages as a {name: html} dictionary."""
+    fixtures = {}
+    for file_name in FIXTURE_FILES:
+        path = os.path.join(SCRIPT_DIR, file_name)
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                fixtures[file_name] = f.read()
+    if "page_src.html" in fixtures:
+        fixtures["missing_fields"] = _without_fields(fixtures["page_src.html"])
+        fixtures["enlarged"] = _enlarged(fixtures["page_src.html"])
+    fixtures["captcha"] = CAPTCHA_PAGE
+    return fixtures
+
+# ------------------------------------------------------------------------------
+# 3. THE MEASUREMENTS
+# ------------------------------------------------------------------------------
+
+def available_backends():
+    """The page readers that are installed on this computer."""
+    backends = []
+    for backend in PARSER_BACKENDS:
+        try:
+            load_page("<html></html>", backend)
+            backends.append(backend)
+        except ValueError:
+            pass
+    return backends
+
+
+def time_parse(html, plan, repeat):
+    """Reads the whole page 'repeat' times and returns the average seconds per page."""
+    parse_html(html, 0, plan)  # One warm-up round, not counted
+    started = time.perf_counter()
+    for _ in range(repeat):
+        parse_html(html, 0, plan)
+    return (time.perf_counter() - started) / repeat
+
+
+def peak_memory(html, plan):
+    """Reads the page once and returns the highest memory Python used while doing it (bytes)."""
+    tracemalloc.start()
+    try:
+        parse_html(html, 0, plan)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def time_fields(html, plan, repeat):
+    """
+    Returns the average time (seconds) spent finding each field, in the same
+    order as the checklist. A fresh copy of the page is loaded for every round,
+    so the first "generic_label" field also pays for building the label index,
+    exactly as it does in a real run. Loading the page is not counted here.
+    """
+    region_html = cut_region(html, plan.region)
+    if region_html is not None:
+        html = region_html
+    totals = {rule.name: 0.0 for rule in plan.fields}
+    for _ in range(repeat):
+        page = load_page(html, plan.backend)
+        for rule in plan.fields:
+            started = time.perf_counter()
+            rule.extractor(page, rule)
+            totals[rule.name] += time.perf_counter() - started
+    return {name: total / repeat for name, total in totals.items()}
+
+
+def run_benchmarks(config, fixtures, backends, repeat):
+    """Measures every test page with every reader, with and without the content region."""
+    results = []
+    for backend in backends:
+        region_plan = compile_plan(config, backend=backend)
+        plans = [("full", region_plan._replace(region=None))]
+        if region_plan.region is not None:
+            plans.append(("region", region_plan))
+
+        for fixture_name, html in fixtures.items():
+            for mode, plan in plans:
+                seconds = time_parse(html, plan, repeat)
+                result = {
+                    "fixture": fixture_name,
+                    "backend": backend,
+                    "mode": mode,
+                    "page_kb": round(len(html.encode("utf-8")) / 1024, 1),
+                    "ms_per_page": round(seconds * 1000, 3),
+                    "pages_per_sec": round(1 / seconds, 1) if seconds else None,
+                    "peak_kb": round(peak_memory(html, plan) / 1024, 1),
+                    "field_us": {},
+                }
+                # Per-field times only make sense on pages that have the fields
+                if isinstance(parse_html(html, 0, plan), dict):
+                    field_times = time_fields(html, plan, repeat)
+                    result["field_us"] = {name: round(t * 1e6, 1) for name, t in field_times.items()}
+                results.append(result)
+                print(f"    {fixture_name:<16} {backend:<12} {mode:<7} "
+                      f"{result['ms_per_page']:>9.3f} ms  {result['pages_per_sec'] or 0:>9.1f} pages/sec  "
+                      f"{result['peak_kb']:>9.1f} KB peak")
+    return results
+
+
+def print_field_costs(results):
+    """Shows how long each field took to find, per reader, on the first example page."""
+    print("\n[+] Time per field (microseconds) on page_src.html:")
+    for result in results:
+        if result["fixture"] != "page_src.html" or not result["field_us"]:
+            continue
+        print(f"    {result['backend']} ({result['mode']}):")
+        for name, micros in result["field_us"].items():
+            print(f"        {name:<20} {micros:>10.1f}")
+
+# ------------------------------------------------------------------------------
+# 4. SAVING AND COMPARING RESULTS
+# ------------------------------------------------------------------------------
+
+def _result_key(result):
+    return (result["fixture"], result["backend"], result["mode"])
+
+
+def compare_results(old_results, new_results, threshold):
+    """
+    Compares this run with an earlier one and returns the list of measurements
+    that became slower by more than 'threshold' (0.10 means 10%).
+    """
+    old_by_key = {_result_key(r): r for r in old_results}
+    regressions = []
+    print(f"\n[+] Compared with the earlier run (slower by more than {threshold:.0%} is flagged):")
+    for result in new_results:
+        old = old_by_key.get(_result_key(result))
+        if not old or not old["ms_per_page"]:
+            continue
+        change = (result["ms_per_page"] - old["ms_per_page"]) / old["ms_per_page"]
+        flag = "  <-- SLOWER" if change > threshold else ""
+        print(f"    {result['fixture']:<16} {result['backend']:<12} {result['mode']:<7} "
+              f"{old['ms_per_page']:>9.3f} -> {result['ms_per_page']:>9.3f} ms ({change:+.1%}){flag}")
+        if flag:
+            regressions.append(result)
+    return regressions
+
+# ------------------------------------------------------------------------------
+# 5. THE MAIN SCRIPT PROCESS
+# ------------------------------------------------------------------------------
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure how fast pages are read")
+    parser.add_argument("--config", help="Settings file to use (default: config.kml next to this script)")
+    parser.add_argument("--backends", nargs="+", choices=sorted(PARSER_BACKENDS),
+                        help="Page readers to test (default: every installed one)")
+    parser.add_argument("--repeat", type=int, default=20, help="How many times to read each page (default: 20)")
+    parser.add_argument("--save", help="Save the results to this JSON file")
+    parser.add_argument("--compare", help="Compare with results saved earlier in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="How much slower (0.10 = 10%%) counts as a problem when comparing")
+    return parser.parse_args()
+
+
+def main():
+    print("--- Peneraju Page-Reading Benchmark ---")
+    args = parse_args()
+
+    config = load_config(args.config or os.path.join(SCRIPT_DIR, "config.kml"))
+    if not config:
+        print("[-] Exiting because config.kml is missing or invalid.")
+        return 1
+
+    fixtures = load_fixtures()
+    backends = args.backends or available_backends()
+    print(f"[+] {len(fixtures)} test pages, readers: {', '.join(backends)}, {args.repeat} rounds each\n")
+    results = run_benchmarks(config, fixtures, backends, max(1, args.repeat))
+    print_field_costs(results)
+
+    if args.save:
+        report = {
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "repeat": args.repeat,
+            "results": results,
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[+] Results saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            old_report = json.load(f)
+        regressions = compare_results(old_report.get("results", []), results, args.threshold)
+        if regressions:
+            print(f"[-] {len(regressions)} measurement(s) got slower than allowed.")
+            return 1
+        print("[+] No measurement got slower than allowed.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
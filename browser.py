@@ -0,0 +1,630 @@
+# ==============================================================================
+# PENERAJU BROWSER HELPERS
+# ==============================================================================
+# Small helpers shared by the Selenium scrapers ('scraper_71.py' and
+# 'scraper_selenium.py') for working with the Chrome window.
+#
+# Waiting for a page to be ready:
+#   The scrapers used to wait a fixed 2 seconds after opening every page. Fast
+#   pages wasted those 2 seconds, and slow pages were sometimes read before
+#   they had finished, which gave false "No info found" rows. Now the browser
+#   is asked a few times per second whether the page is ready, and we carry on
+#   as soon as ONE of these is true:
+#     - the course title is on the page ("ready_selectors"),
+#     - the website's robot check is on the page (the "captcha_markers" from
+#       the "page_rules" part of config.kml),
+#     - a "course not found" text is on the page ("not_found_markers"),
+#     - the browser says the whole page has loaded ("ready_states") and,
+#       "loaded_grace" seconds later, still none of the above has appeared
+#       (some parts of a page are filled in just after it has loaded).
+#   If none of them happens within "timeout" seconds, READY_TIMEOUT is returned
+#   and the scrapers note the ID as an error instead of reading a half-loaded page.
+#
+# The settings live in the "readiness" part of config.kml.
+#
+# A lean Chrome window:
+#   Course pages come with many pictures, fonts and tracking scripts that the
+#   scraper never looks at. In "lean" mode Chrome is told not to download them
+#   ("block_resource_types" and "block_url_patterns"), and to hand the page
+#   over as soon as its text has arrived instead of waiting for every last
+#   picture ("page_load_strategy": "eager"). Pages open faster and each window
+#   uses less memory, so more windows fit on one computer. Chrome can also run
+#   without showing a window at all ("headless"), but then you can't solve a
+#   robot check by hand, so it is off by default.
+#
+# These settings live in the "browser" part of config.kml.
+#
+# Reading the page inside Chrome:
+#   With "extraction": "browser", the fields are found by Chrome itself and
+#   only the answers are sent back, instead of the whole page (see section 4).
+#
+# Finding the Chrome driver:
+#   The driver that matches your Chrome is looked up online only once per
+#   Chrome version, then remembered (see section 5).
+# ==============================================================================
+
+# ------------------------------------------------------------------------------
+# 1. IMPORTING REQUIRED TOOLKITS
+# ------------------------------------------------------------------------------
+import json                         # Helps us remember where the Chrome driver is
+import os                           # Helps us work with files and folders on your computer
+import re                           # Helps us find version numbers in text
+import shutil                       # Helps us find installed programs
+import subprocess                   # Helps us ask programs for their version number
+import sys                          # Helps us tell Windows, Mac and Linux apart
+import time                         # Helps us measure how long we have waited
+from collections import namedtuple  # Helps us create small, read-only records
+from selenium import webdriver      # Helps us set up the Chrome browser
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.service import Service  # Connects Python to Chrome
+from webdriver_manager.chrome import ChromeDriverManager # Automatically gets the right Chrome tool
+from extraction import compile_page_rules, EXTRACTORS
+from store import resolve_path, section_settings
+
+# ------------------------------------------------------------------------------
+# 2. BROWSER SETTINGS AND A LEAN CHROME WINDOW
+# ------------------------------------------------------------------------------
+DEFAULT_BROWSER_SETTINGS = {
+    "workers": 1,
+    "headless": False,
+    "lean": True,
+    "extraction": "python",
+    "driver_path": None,
+    "driver_cache": "driver_cache.json",
+    "recycle_after_pages": 300,
+    "recycle_above_memory_mb": 1500,
+    "recycle_after_errors": 3,
+    "page_load_strategy": "eager",
+    "block_resource_types": ["image", "font", "media"],
+    "block_url_patterns": [
+        "*google-analytics.com*",
+        "*googletagmanager.com*",
+        "*doubleclick.net*",
+        "*connect.facebook.net*",
+    ],
+}
+
+# The kinds of files that "block_resource_types" can name, and how to spot them by their link
+RESOURCE_URL_PATTERNS = {
+    "image": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico"],
+    "font": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    "stylesheet": ["*.css"],
+    "media": ["*.mp4", "*.webm", "*.mp3", "*.ogg", "*.wav"],
+}
+
+
+def blocked_url_patterns(settings):
+    """Lists every link pattern that Chrome should not download (empty when lean mode is off)."""
+    if not settings["lean"]:
+        return []
+    patterns = []
+    for resource_type in settings["block_resource_types"]:
+        if resource_type not in RESOURCE_URL_PATTERNS:
+            raise ValueError(f"Unknown resource type to block: '{resource_type}' "
+                             f"(choose from: {', '.join(sorted(RESOURCE_URL_PATTERNS))})")
+        patterns.extend(RESOURCE_URL_PATTERNS[resource_type])
+    patterns.extend(settings["block_url_patterns"])
+    return patterns
+
+
+def chrome_options(settings):
+    """Builds the Chrome start-up options from the "browser" settings."""
+    options = webdriver.ChromeOptions()
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    if settings["headless"]:
+        options.add_argument("--headless=new")
+    if settings["lean"]:
+        options.page_load_strategy = settings["page_load_strategy"]
+        if "image" in settings["block_resource_types"]:
+            # Also switch pictures off inside Chrome itself (this catches pictures without a file ending)
+            options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    return options
+
+
+def block_resources(driver, settings):
+    """Tells an open Chrome window (through its DevTools connection) which links not to download."""
+    patterns = blocked_url_patterns(settings)
+    if patterns:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+
+# ------------------------------------------------------------------------------
+# 3. WAITING FOR A PAGE TO BE READY
+# ------------------------------------------------------------------------------
+DEFAULT_READINESS = {
+    "timeout": 15,
+    "poll_interval": 0.2,
+    "ready_selectors": ["h5.card-title"],
+    "not_found_markers": ["No info found"],
+    "ready_states": ["complete"],
+    "loaded_grace": 1.0,
+}
+
+# What the wait found (and why it stopped waiting)
+READY = "ready"                 # The course title is there
+READY_CAPTCHA = "captcha"       # The robot check is there
+READY_NOT_FOUND = "not-found"   # The website says there is no such course
+READY_LOADED = "loaded"         # The page finished loading, with none of the above
+READY_TIMEOUT = "timeout"       # We gave up waiting
+
+ReadinessRules = namedtuple(
+    "ReadinessRules",
+    ["timeout", "poll_interval", "ready_selectors", "captcha_markers", "not_found_markers",
+     "ready_states", "loaded_grace"],
+)
+
+# One question sent to the browser on each check, so every check is one quick
+# round trip. It answers with the first condition that is true, or null.
+_READINESS_SCRIPT = """
+var rules = arguments[0];
+for (var i = 0; i < rules.ready_selectors.length; i++) {
+    if (document.querySelector(rules.ready_selectors[i])) { return "ready"; }
+}
+var html = document.documentElement ? document.documentElement.innerHTML : "";
+for (var j = 0; j < rules.captcha_markers.length; j++) {
+    if (html.indexOf(rules.captcha_markers[j]) >= 0) { return "captcha"; }
+}
+for (var k = 0; k < rules.not_found_markers.length; k++) {
+    if (html.indexOf(rules.not_found_markers[k]) >= 0) { return "not-found"; }
+}
+if (rules.ready_states.indexOf(document.readyState) >= 0) { return "loaded"; }
+return null;
+"""
+
+
+def compile_readiness(config):
+    """Turns the "readiness" setting (or the defaults above) into ReadinessRules."""
+    settings = section_settings(config, "readiness", DEFAULT_READINESS)
+    return ReadinessRules(
+        timeout=float(settings["timeout"]),
+        poll_interval=float(settings["poll_interval"]),
+        ready_selectors=tuple(settings["ready_selectors"]),
+        captcha_markers=compile_page_rules(config or {}).captcha,
+        not_found_markers=tuple(settings["not_found_markers"]),
+        ready_states=tuple(settings["ready_states"]),
+        loaded_grace=float(settings["loaded_grace"]),
+    )
+
+
+def wait_until_ready(driver, rules):
+    """
+    Waits until the page open in 'driver' is ready to be read (see the top of
+    this file) and returns what was found: READY, READY_CAPTCHA,
+    READY_NOT_FOUND, READY_LOADED or READY_TIMEOUT.
+    """
+    script_rules = {
+        "ready_selectors": list(rules.ready_selectors),
+        "captcha_markers": list(rules.captcha_markers),
+        "not_found_markers": list(rules.not_found_markers),
+        "ready_states": list(rules.ready_states),
+    }
+    deadline = time.monotonic() + rules.timeout
+    loaded_at = None
+    while True:
+        try:
+            state = driver.execute_script(_READINESS_SCRIPT, script_rules)
+        except WebDriverException:
+            # The page is still being swapped in; ask again on the next round
+            state = None
+        now = time.monotonic()
+        if state == READY_LOADED:
+            # Give late parts of the page a moment to appear before settling for "loaded"
+            loaded_at = loaded_at or now
+            if now - loaded_at >= rules.loaded_grace:
+                return READY_LOADED
+        elif state:
+            return state
+        if now >= deadline:
+            return READY_LOADED if loaded_at else READY_TIMEOUT
+        time.sleep(rules.poll_interval)
+
+# ------------------------------------------------------------------------------
+# 4. READING THE PAGE INSIDE THE BROWSER
+# ------------------------------------------------------------------------------
+# Normally the whole page (about 138 KB) is copied out of Chrome with
+# 'driver.page_source' and then read again by Python. With "extraction" set to
+# "browser", the field rules from config.kml are turned into a small
+# JavaScript program that Chrome runs itself, and only the finished fields
+# come back. It follows the same steps as parse_html in extraction.py (quick
+# page check, content region, title check, then the five field methods). The
+# rules run on the page Chrome already has open: the content region is looked
+# up between its two markers in that page, so nothing is read a second time.
+#   "python"  : the original way (copy the page out, read it in Python)
+#   "browser" : read it inside Chrome; Python is only used if that fails
+#   "verify"  : do both, warn about any difference, and keep Python's answer
+EXTRACTION_MODES = ("python", "browser", "verify")
+
+_EXTRACTION_SCRIPT = """
+var plan = arguments[0], courseId = arguments[1];
+var NO_TEXT_INSIDE = {script: true, style: true, template: true};
+
+function isString(node) { return node.nodeType === 3 || node.nodeType === 4 || node.nodeType === 8; }
+
+// All the text inside a block, each piece trimmed, glued together (like get_text(strip=True))
+function textOf(node) {
+    var parts = [];
+    (function walk(parent) {
+        for (var child = parent.firstChild; child; child = child.nextSibling) {
+            if (child.nodeType === 3 || child.nodeType === 4) {
+                var piece = child.data.trim();
+                if (piece) { parts.push(piece); }
+            } else if (child.nodeType === 1 && !NO_TEXT_INSIDE[child.localName]) {
+                walk(child);
+            }
+        }
+    })(node);
+    return parts.join("");
+}
+// The first piece of text directly inside the block
+function ownString(node) {
+    for (var child = node.firstChild; child; child = child.nextSibling) {
+        if (isString(child)) { return child.data; }
+    }
+    return null;
+}
+// The block's text, only when the block holds exactly one piece of text
+function soleString(node) {
+    if (node.childNodes.length !== 1) { return null; }
+    var child = node.firstChild;
+    if (isString(child)) { return child.data; }
+    return child.nodeType === 1 ? soleString(child) : null;
+}
+function attr(node, name, fallback) {
+    var value = node.getAttribute(name);
+    return value === null ? fallback : value;
+}
+function hasClass(node, className) {
+    return (" " + (node.getAttribute("class") || "").split(/\\s+/).join(" ") + " ").indexOf(" " + className + " ") >= 0;
+}
+function nextSiblingTag(node, tagName, className) {
+    for (var sibling = node.nextSibling; sibling; sibling = sibling.nextSibling) {
+        if (sibling.nodeType === 1 && sibling.localName === tagName && (!className || hasClass(sibling, className))) {
+            return sibling;
+        }
+    }
+    return null;
+}
+// The next block in page order (its own children first, then what follows it)
+function nextInOrder(node) {
+    if (node.firstChild) { return node.firstChild; }
+    while (node) {
+        if (node.nextSibling) { return node.nextSibling; }
+        node = node.parentNode;
+    }
+    return null;
+}
+function findNext(node, tagName, scope) {
+    for (var next = nextInOrder(node); next && scope.contains(next); next = nextInOrder(next)) {
+        if (next.nodeType === 1 && next.localName === tagName) { return next; }
+    }
+    return null;
+}
+function containsAny(html, markers) {
+    for (var i = 0; i < markers.length; i++) {
+        if (html.indexOf(markers[i]) >= 0) { return true; }
+    }
+    return false;
+}
+
+// The content region, found in the live page: the blocks between the start marker
+// (a comment like "<!-- Main Content -->" or a tag's opening text) and the end marker.
+// Without a start block the scope is the whole page.
+function findMarker(marker, after) {
+    var comment = /^<!--([\s\S]*)-->$/.exec(marker), tag = comment ? null : /^<([\w-]+)/.exec(marker);
+    if (!comment && !tag) { return null; }
+    var walker = document.createTreeWalker(document, comment ? NodeFilter.SHOW_COMMENT : NodeFilter.SHOW_ELEMENT);
+    if (after) { walker.currentNode = after; }
+    for (var node = walker.nextNode(); node; node = walker.nextNode()) {
+        if (comment ? node.data === comment[1]
+                    : node.localName === tag[1].toLowerCase() && node.outerHTML.lastIndexOf(marker, 0) === 0) {
+            return node;
+        }
+    }
+    return null;
+}
+function Scope(start, end) { this.start = start; this.end = end; }
+Scope.prototype.contains = function (node) {
+    if (!this.start) { return true; }
+    var inside = node === this.start || (this.start.compareDocumentPosition(node) & Node.DOCUMENT_POSITION_FOLLOWING);
+    return Boolean(inside && (!this.end || (this.end.compareDocumentPosition(node) & Node.DOCUMENT_POSITION_PRECEDING)));
+};
+Scope.prototype.querySelectorAll = function (selector) {
+    var found = document.querySelectorAll(selector);
+    if (!this.start) { return found; }
+    var kept = [];
+    for (var i = 0; i < found.length; i++) {
+        if (this.contains(found[i])) { kept.push(found[i]); }
+    }
+    return kept;
+};
+Scope.prototype.querySelector = function (selector) {
+    if (!this.start) { return document.querySelector(selector); }
+    return this.querySelectorAll(selector)[0] || null;
+};
+
+// The label index: one walk over the page for every "generic_label" field
+function LabelIndex(doc) {
+    this.divLabels = []; this.pLabels = Object.create(null); this.labelTags = []; this.answers = Object.create(null);
+    var tags = doc.querySelectorAll("div, p, label");
+    for (var i = 0; i < tags.length; i++) {
+        var tag = tags[i], text;
+        if (tag.localName === "p") {
+            text = textOf(tag).toLowerCase();
+            if (!(text in this.pLabels)) { this.pLabels[text] = tag; }
+        } else if (tag.localName === "div") {
+            if (hasClass(tag, "label")) {
+                text = soleString(tag);
+                if (text) { this.divLabels.push([text.toLowerCase(), tag]); }
+            }
+        } else {
+            text = soleString(tag);
+            if (text) { this.labelTags.push([text.toLowerCase(), tag]); }
+        }
+    }
+}
+function firstContaining(entries, labelLower) {
+    for (var i = 0; i < entries.length; i++) {
+        if (entries[i][0].indexOf(labelLower) >= 0) { return entries[i][1]; }
+    }
+    return null;
+}
+LabelIndex.prototype.find = function (labelLower) {
+    if (!(labelLower in this.answers)) { this.answers[labelLower] = this.lookup(labelLower); }
+    return this.answers[labelLower];
+};
+LabelIndex.prototype.lookup = function (labelLower) {
+    var found = firstContaining(this.divLabels, labelLower), value;
+    if (found && (value = nextSiblingTag(found, "div", "value"))) { return textOf(value); }
+    found = this.pLabels[labelLower];
+    if (found && (value = nextSiblingTag(found, "p"))) { return textOf(value); }
+    found = firstContaining(this.labelTags, labelLower);
+    if (found) {
+        value = nextSiblingTag(found, "span") || nextSiblingTag(found, "div");
+        if (value) { return textOf(value); }
+    }
+    return "N/A";
+};
+
+// The five field methods (the same as in extraction.py)
+var METHODS = {
+    "text": function (doc, rule) {
+        var element = doc.querySelector(rule.selector);
+        if (!element) { return "N/A"; }
+        var own = ownString(element);
+        return own && own.trim() ? own.trim() : textOf(element);
+    },
+    "parent_text": function (doc, rule) {
+        var element = doc.querySelector(rule.selector);
+        return element && element.parentNode ? textOf(element.parentNode) : "N/A";
+    },
+    "attribute": function (doc, rule) {
+        var element = doc.querySelector(rule.selector);
+        if (!element) { return "N/A"; }
+        var value = attr(element, rule.attribute, "");
+        if (!value) { return "N/A"; }
+        if (rule.remove_prefix) { value = value.split(rule.remove_prefix).join(""); }
+        return value.trim();
+    },
+    "next_tag_attribute": function (doc, rule) {
+        var element = doc.querySelector(rule.selector);
+        var link = element && findNext(element, rule.next_tag, doc);
+        return link ? attr(link, rule.attribute, "N/A").trim() : "N/A";
+    },
+    "generic_label": function (doc, rule, labels) { return labels().find(rule.label_lower); },
+    "missing": function () { return "N/A"; }
+};
+
+// Step 1: the quick page check on the raw page text
+var html = document.documentElement ? document.documentElement.outerHTML : "";
+if (!html.trim()) { return {kind: "EMPTY", result: null}; }
+if (!containsAny(html, plan.valid_markers)) {
+    if (containsAny(html, plan.captcha_markers)) { return {kind: "CAPTCHA", result: "CAPTCHA"}; }
+    return {kind: "EMPTY", result: null};
+}
+
+// Step 2: read the live page itself, only inside the content region when there
+// is one (and it holds the title)
+var doc = null, title = null;
+var regionStart = plan.region_start ? findMarker(plan.region_start, null) : null;
+if (regionStart) {
+    doc = new Scope(regionStart, plan.region_end ? findMarker(plan.region_end, regionStart) : null);
+    title = doc.querySelector("h5.card-title");
+}
+if (!title) {
+    doc = new Scope(null, null);
+    title = doc.querySelector("h5.card-title");
+}
+if (!title) {
+    if (containsAny(html, plan.captcha_markers)) { return {kind: "VALID", result: "CAPTCHA"}; }
+    return {kind: "VALID", result: null};
+}
+
+// Step 3: follow the checklist, one field at a time
+var index = null;
+function labels() { return index || (index = new LabelIndex(doc)); }
+var data = {"ID": String(courseId)};
+for (var i = 0; i < plan.fields.length; i++) {
+    var rule = plan.fields[i];
+    data[rule.name] = METHODS[rule.method](doc, rule, labels);
+}
+return {kind: "VALID", result: data};
+"""
+
+
+def browser_plan(plan):
+    """Turns an ExtractionPlan into plain settings that can be handed to the JavaScript above."""
+    method_names = {extractor: name for name, extractor in EXTRACTORS.items()}
+    fields = []
+    for rule in plan.fields:
+        fields.append({
+            "name": rule.name,
+            "method": method_names.get(rule.extractor, "missing"),
+            "selector": rule.selector,
+            "attribute": rule.attribute,
+            "remove_prefix": rule.remove_prefix,
+            "next_tag": rule.next_tag,
+            "label_lower": rule.label_lower,
+        })
+    return {
+        "fields": fields,
+        "valid_markers": list(plan.page_rules.valid),
+        "captcha_markers": list(plan.page_rules.captcha),
+        "region_start": plan.region.start if plan.region else None,
+        "region_end": plan.region.end if plan.region else None,
+    }
+
+
+def extract_in_browser(driver, script_plan, course_id):
+    """
+    Reads the page open in 'driver' inside Chrome itself. Returns (page kind,
+    result), where result is what parse_html would give: the bucket of fields,
+    "CAPTCHA", or None. 'script_plan' comes from browser_plan().
+    """
+    answer = driver.execute_script(_EXTRACTION_SCRIPT, script_plan, course_id)
+    if not isinstance(answer, dict) or "kind" not in answer:
+        raise WebDriverException(f"in-browser reading returned {answer!r}")
+    return answer["kind"], answer["result"]
+
+
+def differing_fields(browser_result, python_result):
+    """Lists the fields where the in-browser reading and the Python reading disagree."""
+    if not isinstance(browser_result, dict) or not isinstance(python_result, dict):
+        return [] if browser_result == python_result else ["(whole page)"]
+    names = list(python_result) + [name for name in browser_result if name not in python_result]
+    return [name for name in names if browser_result.get(name) != python_result.get(name)]
+
+# ------------------------------------------------------------------------------
+# 5. FINDING THE CHROME DRIVER QUICKLY
+# ------------------------------------------------------------------------------
+# Chrome is controlled through a small helper program, the "ChromeDriver",
+# which must match the installed Chrome version. The scrapers used to ask
+# ChromeDriverManager for it on every start, which looks up versions on the
+# internet first (slow) and fails completely without internet.
+#
+# Now the driver that was found is written down in a small file
+# ("driver_cache" in the "browser" part of config.kml) next to the Chrome
+# version it belongs to. On the next start, if Chrome still has the same
+# version and the driver file is still there (and answers with the same main
+# version number), it is used straight away. ChromeDriverManager is only asked
+# when Chrome was updated. If Chrome's version can't be read, nothing written
+# down can be checked against it, so ChromeDriverManager is asked every time.
+# A fixed "driver_path" in config.kml skips all this.
+# Where Chrome may be installed, for asking its version without starting it
+_CHROME_COMMANDS = (
+    "google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome",
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+)
+_VERSION_NUMBER = re.compile(r"(\d+)\.(\d+)\.(\d+)\.(\d+)")
+
+
+def _version_from_command(command):
+    """Runs '<command> --version' and returns the version number it prints (or None)."""
+    try:
+        output = subprocess.run([command, "--version"], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = _VERSION_NUMBER.search(output or "")
+    return match.group(0) if match else None
+
+
+def installed_chrome_version():
+    """Returns the installed Chrome version (like '120.0.6099.109') without going online, or None."""
+    if sys.platform.startswith("win"):
+        import winreg  # Only exists on Windows
+        for root in (winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE):
+            try:
+                with winreg.OpenKey(root, r"Software\Google\Chrome\BLBeacon") as key:
+                    return winreg.QueryValueEx(key, "version")[0]
+            except OSError:
+                continue
+        return None
+    for command in _CHROME_COMMANDS:
+        if os.path.isabs(command) and not os.path.isfile(command):
+            continue
+        if not os.path.isabs(command) and shutil.which(command) is None:
+            continue
+        version = _version_from_command(command)
+        if version:
+            return version
+    return None
+
+
+def _major(version):
+    return version.split(".")[0] if version else None
+
+
+def driver_is_usable(driver_path, chrome_version=None):
+    """
+    Checks on this computer only that the driver file exists, can be run, and
+    (when we know Chrome's version) belongs to the same main Chrome version.
+    """
+    if not driver_path or not os.path.isfile(driver_path) or not os.access(driver_path, os.X_OK):
+        return False
+    if chrome_version is None:
+        return True
+    return _major(_version_from_command(driver_path)) == _major(chrome_version)
+
+
+def _read_driver_cache(cache_file):
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_driver_cache(cache_file, drivers):
+    temp_file = cache_file + ".tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(drivers, f, indent=2)
+    os.replace(temp_file, cache_file)
+
+
+def resolve_driver_path(settings, base_dir=None):
+    """
+    Returns the path of the ChromeDriver to use, or None to let Selenium find
+    one by itself. See the top of this section for the order things are tried in.
+    """
+    # 1. A fixed path in config.kml always wins
+    if settings["driver_path"]:
+        if not driver_is_usable(settings["driver_path"]):
+            raise ValueError(f"The ChromeDriver in 'driver_path' can't be used: {settings['driver_path']}")
+        return settings["driver_path"]
+
+    cache_file = resolve_path(settings["driver_cache"], base_dir)
+    drivers = _read_driver_cache(cache_file)
+    chrome_version = installed_chrome_version()
+    # Drivers match Chrome by its main version number, so small Chrome updates don't need a new one
+    key = _major(chrome_version)
+
+    # 2. The driver we found last time for this same Chrome version (only when
+    #    the version is known: otherwise an old driver would be trusted forever)
+    if key and driver_is_usable(drivers.get(key), chrome_version):
+        return drivers[key]
+
+    # 3. Chrome is new (or nothing was written down yet): ask ChromeDriverManager once
+    try:
+        driver_path = ChromeDriverManager().install()
+    except Exception as e:
+        # Probably offline: try any driver we used before that still matches Chrome
+        for old_path in drivers.values():
+            if driver_is_usable(old_path, chrome_version):
+                print(f"[!] Could not look up the ChromeDriver ({e}); using the one from last time")
+                return old_path
+        print(f"[!] Could not look up the ChromeDriver ({e}); letting Selenium find one")
+        return None
+
+    if not key:
+        return driver_path
+    drivers[key] = driver_path
+    try:
+        _write_driver_cache(cache_file, drivers)
+    except OSError as e:
+        print(f"[!] Could not remember the ChromeDriver location ({e})")
+    return driver_path
+
+
+def chrome_service(driver_path):
+    """A Selenium 'Service' for a driver from resolve_driver_path() (one is needed per Chrome window)."""
+    return Service(driver_path) if driver_path else Service()
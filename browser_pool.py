@@ -0,0 +1,267 @@
+# ==============================================================================
+# PENERAJU BROWSER POOL (several Chrome windows at the same time)
+# ==============================================================================
+# 'scraper_71.py' used to drive ONE Chrome window through every course ID, one
+# after the other, so it could never go faster than one page every 7-12
+# seconds. This file lets it open a few Chrome windows ("workers") that share
+# one list of IDs: whenever a window is free, it takes the next ID.
+#
+#   - Only the main script writes to 'output.csv': the workers just hand their
+#     results back, so the file is never written by two windows at once.
+#   - Questions for the person running the script (like "please solve the
+#     robot check") all go through one "operator desk". Only one question is
+#     shown at a time, and while a question is open the other windows pause
+#     before their next page, so nobody types into the wrong prompt.
+#   - A Chrome window that has been open for a long time slowly uses more and
+#     more memory. Each window is therefore closed and opened again ("recycled")
+#     after a number of pages, when it uses too much memory, or after several
+#     errors in a row. Its cookies are carried over to the new window, so the
+#     website still recognises us, and it carries on with the next ID.
+#
+# The number of windows is the "workers" setting in the "browser" part of
+# config.kml (or --workers; see browser.py). 1 window works exactly like before.
+# The "recycle_..." settings in the same part control the recycling.
+# ==============================================================================
+
+# ------------------------------------------------------------------------------
+# 1. IMPORTING REQUIRED TOOLKITS
+# ------------------------------------------------------------------------------
+import queue        # Helps us hand IDs to the workers and results back safely
+import threading    # Helps us run several browser windows at the same time
+from collections import namedtuple  # Helps us create small, read-only records
+
+try:
+    import psutil   # Helps us measure how much memory Chrome uses (optional)
+except ImportError:
+    psutil = None
+
+# ------------------------------------------------------------------------------
+# 2. WHEN TO RECYCLE A BROWSER WINDOW
+# ------------------------------------------------------------------------------
+# Any of the limits can be 0 to switch it off.
+RecyclePolicy = namedtuple("RecyclePolicy", ["max_pages", "max_memory_mb", "max_errors"])
+NEVER_RECYCLE = RecyclePolicy(0, 0, 0)
+
+
+def recycle_policy(settings):
+    """Builds a RecyclePolicy from the "browser" settings."""
+    return RecyclePolicy(
+        max_pages=int(settings.get("recycle_after_pages") or 0),
+        max_memory_mb=float(settings.get("recycle_above_memory_mb") or 0),
+        max_errors=int(settings.get("recycle_after_errors") or 0),
+    )
+
+
+def browser_memory_mb(driver):
+    """
+    Returns the memory (in MB) used by a Chrome window: the driver program and
+    every Chrome process it started. None if it can't be measured (for
+    example when the optional 'psutil' toolkit is not installed).
+    """
+    process = getattr(getattr(driver, "service", None), "process", None)
+    if psutil is None or process is None:
+        return None
+    try:
+        root = psutil.Process(process.pid)
+        total = 0
+        for each in [root] + root.children(recursive=True):
+            try:
+                total += each.memory_info().rss
+            except psutil.Error:
+                pass  # That process just ended
+        return total / (1024 * 1024)
+    except psutil.Error:
+        return None
+
+
+def recycle_reason(policy, pages, errors, driver):
+    """Returns why a window should be recycled now (as text), or None if it can carry on."""
+    if policy.max_errors and errors >= policy.max_errors:
+        return f"{errors} errors in a row"
+    if policy.max_pages and pages >= policy.max_pages:
+        return f"{pages} pages"
+    if policy.max_memory_mb:
+        memory = browser_memory_mb(driver)
+        if memory is not None and memory > policy.max_memory_mb:
+            return f"using {memory:.0f} MB of memory"
+    return None
+
+# ------------------------------------------------------------------------------
+# 3. THE OPERATOR DESK (one place for all questions to the user)
+# ------------------------------------------------------------------------------
+
+class OperatorDesk:
+    """
+    Makes sure only one question is on the screen at a time, and lets every
+    worker pause (wait_until_clear) while a question is waiting for an answer.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear = threading.Event()
+        self._clear.set()
+
+    def ask(self, *lines):
+        """Prints the lines, then waits for the user to press ENTER (the last line is the prompt)."""
+        with self._lock:
+            self._clear.clear()
+            try:
+                for line in lines[:-1]:
+                    print(line)
+                return input(lines[-1])
+            finally:
+                self._clear.set()
+
+    def wait_until_clear(self):
+        """Pauses the calling worker while a question is open."""
+        self._clear.wait()
+
+# ------------------------------------------------------------------------------
+# 4. THE POOL OF BROWSER WINDOWS
+# ------------------------------------------------------------------------------
+
+class BrowserPool:
+    """
+    'size' browser windows made by make_driver(), each driven by its own worker
+    thread and fed from one shared queue of course IDs. Windows are recycled
+    following 'recycle' (a RecyclePolicy); 'home_url' is the page a new window
+    opens first, so the cookies of the old window can be put back.
+    """
+
+    def __init__(self, make_driver, size=1, desk=None, recycle=NEVER_RECYCLE, home_url=None):
+        self.make_driver = make_driver
+        self.size = max(1, int(size))
+        self.desk = desk or OperatorDesk()
+        self.recycle = recycle
+        self.home_url = home_url
+        self.drivers = []
+        self._stop = threading.Event()
+
+    def start(self):
+        """Opens all the browser windows (one after the other)."""
+        for _ in range(self.size):
+            self.drivers.append(self.make_driver())
+        return self.drivers
+
+    def restart(self, number, reason):
+        """
+        Closes browser window 'number' and opens a fresh one in its place,
+        carrying the cookies over so the website still knows us.
+        """
+        old_driver = self.drivers[number - 1]
+        print(f"[!] Restarting Chrome window {number} ({reason})")
+        try:
+            cookies = old_driver.get_cookies()
+        except Exception:
+            cookies = []
+        try:
+            old_driver.quit()
+        except Exception:
+            pass
+
+        new_driver = self.make_driver()
+        self.drivers[number - 1] = new_driver
+        if self.home_url and cookies:
+            # Cookies can only be set for the website that is currently open
+            new_driver.get(self.home_url)
+            for cookie in cookies:
+                try:
+                    new_driver.add_cookie(cookie)
+                except Exception:
+                    pass  # A cookie Chrome won't take back (e.g. for another domain)
+        return new_driver
+
+    def run(self, ids, visit, handle_result):
+        """
+        Visits every ID. Each worker calls visit(worker_number, driver, id) and
+        hands back what it returns; handle_result(id, outcome, error) is then
+        called HERE, in the main script, for every ID as it finishes (so not
+        necessarily in ID order when there is more than one window).
+        """
+        ids = list(ids)
+        self._stop.clear()
+        jobs = queue.Queue()
+        for current_id in ids:
+            jobs.put(current_id)
+        # A small hand-back queue: a worker waits if the main script falls behind
+        results = queue.Queue(maxsize=self.size * 2)
+
+        def worker(number):
+            driver = self.drivers[number - 1]
+            pages = errors = 0
+            while not self._stop.is_set():
+                try:
+                    current_id = jobs.get_nowait()
+                except queue.Empty:
+                    return
+                self.desk.wait_until_clear()
+                try:
+                    outcome, error = visit(number, driver, current_id), None
+                    errors = 0
+                except Exception as e:
+                    outcome, error = None, e
+                    errors += 1
+                pages += 1
+                results.put((current_id, outcome, error))
+
+                reason = recycle_reason(self.recycle, pages, errors, driver)
+                if reason and not jobs.empty():
+                    try:
+                        driver = self.restart(number, reason)
+                    except Exception as e:
+                        # No new window: this worker stops, the others carry on with the IDs
+                        print(f"[-] Could not restart Chrome window {number}: {e}")
+                        return
+                    pages = errors = 0
+
+        threads = [threading.Thread(target=worker, args=(number,), daemon=True)
+                   for number in range(1, len(self.drivers) + 1)]
+        for thread in threads:
+            thread.start()
+        try:
+            finished = 0
+            while finished < len(ids):
+                try:
+                    # Wake up now and then, so Ctrl+C is noticed straight away
+                    current_id, outcome, error = results.get(timeout=0.5)
+                except queue.Empty:
+                    if not any(thread.is_alive() for thread in threads) and results.empty():
+                        break
+                    continue
+                finished += 1
+                handle_result(current_id, outcome, error)
+
+            # Every window stopped early (none could be restarted): the IDs still on
+            # the list are handed back as errors, so they are visited again next run
+            left = []
+            while True:
+                try:
+                    left.append(jobs.get_nowait())
+                except queue.Empty:
+                    break
+            if left:
+                print(f"[-] No Chrome window is left: {len(left)} ID{'s were' if len(left) > 1 else ' was'} "
+                      f"not visited (noted as errors)")
+            for current_id in left:
+                handle_result(current_id, None, RuntimeError("no Chrome window was left to visit it"))
+        finally:
+            # Tell the workers to stop after their current page (e.g. after Ctrl+C),
+            # and wait for them, so no window is closed while a worker still uses it
+            self._stop.set()
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+                    # A worker may be waiting to hand back a page nobody will read now
+                    try:
+                        results.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def quit(self):
+        """Closes every browser window."""
+        for driver in self.drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        self.drivers = []
@@ -0,0 +1,229 @@
+# ==============================================================================
+# PENERAJU CHANGE DETECTION (only save what really changed)
+# ==============================================================================
+# Visiting the same IDs again (for example with --start-over, to look for
+# updated courses) used to read every page again and add every row to
+# 'output.csv' again, even when nothing about the course had changed.
+#
+# Comparing the pages byte by byte doesn't help: the website puts a few
+# "volatile" values in every page that are different on every visit (the
+# security tokens called csrf-token, _token and __ncforminfo). Two visits to
+# the same unchanged course never look the same.
+#
+# This file keeps a "fingerprint" of every course, in two layers:
+#   1. PAGE FINGERPRINT   : a hash of the course details part of the page
+#      (the "content_region" of config.kml), after removing the volatile values
+#      and ignoring spaces and line breaks. If it is the same as last time, the
+#      page is not even read, and no row is written.
+#   2. RECORD FINGERPRINT : a hash of the row read from the page. If the page
+#      changed but the row did not (say, a new volatile value we don't know
+#      about yet), the row is still not written again.
+# At the end of the run the scrapers say how many courses are new, changed,
+# gone (the ID is empty now) or unchanged, and list the IDs in "report_file".
+#
+# The settings live in the "changes" part of config.kml:
+#     "enabled"           : true / false
+#     "file"              : the database file to keep the fingerprints in
+#     "volatile_patterns" : the parts of a page that change on every visit
+#                           (regular expressions; whatever they match is removed)
+#     "report_file"       : the file listing the IDs that changed on this run
+#
+# The scrapers also accept --write-unchanged to write every row anyway.
+# ==============================================================================
+
+# ------------------------------------------------------------------------------
+# 1. IMPORTING REQUIRED TOOLKITS
+# ------------------------------------------------------------------------------
+import csv          # Helps us write the list of changed IDs
+import hashlib      # Helps us make the fingerprints
+import json         # Helps us turn a row into text before fingerprinting it
+import re           # Helps us find the volatile parts of a page
+import time         # Helps us note when each ID was checked and changed
+from collections import Counter  # Helps us count the changes for the summary
+from extraction import compile_region, cut_region
+from store import SqliteStore, resolve_path, section_settings
+
+# ------------------------------------------------------------------------------
+# 2. SETTINGS
+# ------------------------------------------------------------------------------
+DEFAULT_CHANGE_SETTINGS = {
+    "enabled": True,
+    "file": "fingerprints.sqlite",
+    "volatile_patterns": [
+        r'<meta name="csrf-token" content="[^"]*"',
+        r'name="_token" value="[^"]*"',
+        r'name="__ncforminfo" value="[^"]*"',
+    ],
+    "report_file": "changes.csv",
+}
+
+# How one course compares with the last run
+CHANGE_NEW = "new"              # Never seen before
+CHANGE_CHANGED = "changed"      # The row is different from last time
+CHANGE_SAME = "unchanged"       # Nothing meaningful changed
+CHANGE_GONE = "gone"            # The ID had a course last time, but is empty now
+
+# Runs of spaces, tabs and line breaks count as one space
+_WHITESPACE = re.compile(r"\s+")
+
+
+def add_change_arguments(parser):
+    """Adds the --write-unchanged switch to a script's argument parser."""
+    parser.add_argument("--write-unchanged", action="store_true",
+                        help="Read every page and write every row, even if the course has not changed since the last run")
+
+
+def record_fingerprint(record):
+    """The fingerprint of one row (the same row always gives the same fingerprint)."""
+    text = json.dumps(record, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+# ------------------------------------------------------------------------------
+# 3. THE FINGERPRINTS
+# ------------------------------------------------------------------------------
+
+class ChangeTracker(SqliteStore):
+    """
+    The fingerprints of every course seen so far, kept in an SQLite database.
+    'scope' is the name of the scraper plus its fields (or field rules), because
+    every scraper reads its own kind of row and a change of fields changes it too. 'region' is a ContentRegion (see extraction.compile_region).
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS fingerprints ("
+        " scope TEXT NOT NULL, course_id TEXT NOT NULL, page_hash TEXT, record_hash TEXT NOT NULL,"
+        " last_checked REAL NOT NULL, last_changed REAL NOT NULL, PRIMARY KEY (scope, course_id))",
+    )
+
+    def __init__(self, path, scope, volatile_patterns=(), region=None, report_file=None):
+        self.scope = scope
+        self.report_file = report_file
+        self.volatile = [re.compile(pattern) for pattern in volatile_patterns]
+        self.region = region
+        self.changes = {}       # ID (as text) -> how it compares with the last run
+        super().__init__(path)
+
+    @classmethod
+    def from_config(cls, config, scope, base_dir=None):
+        """Opens the fingerprints described in config.kml, or returns None if change detection is switched off."""
+        settings = section_settings(config, "changes", DEFAULT_CHANGE_SETTINGS)
+        if not settings["enabled"]:
+            return None
+        return cls(resolve_path(settings["file"], base_dir), scope, volatile_patterns=settings["volatile_patterns"],
+                   region=compile_region(config or {}), report_file=resolve_path(settings["report_file"], base_dir))
+
+    def normalize(self, html):
+        """
+        Returns the part of the page that matters, as text: the content region
+        (or the whole page), without the volatile values and with every run of
+        spaces and line breaks turned into one space.
+        """
+        content = cut_region(html, self.region)
+        if content is None:
+            content = html
+        if isinstance(content, bytes):
+            content = content.decode("utf-8", errors="replace")
+        for pattern in self.volatile:
+            content = pattern.sub("", content)
+        return _WHITESPACE.sub(" ", content).strip()
+
+    def page_fingerprint(self, html):
+        """The fingerprint of a page (text or bytes): the same for two visits to an unchanged course."""
+        return hashlib.sha256(self.normalize(html).encode("utf-8")).hexdigest()
+
+    def page_unchanged(self, course_id, fingerprint):
+        """True if the page of 'course_id' has the same fingerprint as last time."""
+        if fingerprint is None:
+            return False
+        with self._lock:
+            row = self._db.execute("SELECT page_hash FROM fingerprints WHERE scope = ? AND course_id = ?",
+                                   (self.scope, str(course_id))).fetchone()
+        return row is not None and row[0] == fingerprint
+
+    def compare(self, course_id, record):
+        """Returns CHANGE_NEW, CHANGE_CHANGED or CHANGE_SAME for the row read for 'course_id'."""
+        with self._lock:
+            row = self._db.execute("SELECT record_hash FROM fingerprints WHERE scope = ? AND course_id = ?",
+                                   (self.scope, str(course_id))).fetchone()
+        if row is None:
+            return CHANGE_NEW
+        return CHANGE_SAME if row[0] == record_fingerprint(record) else CHANGE_CHANGED
+
+    def mark_unchanged(self, course_id, page_fingerprint=None):
+        """
+        Notes that the course 'course_id' was found unchanged. A new page
+        fingerprint (the page changed, but not its row) replaces the old one, so
+        next time the page is not even read.
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE fingerprints SET last_checked = ?, page_hash = COALESCE(?, page_hash)"
+                " WHERE scope = ? AND course_id = ?",
+                (time.time(), page_fingerprint, self.scope, str(course_id)),
+            )
+            self.changes[str(course_id)] = CHANGE_SAME
+
+    def update(self, course_id, record, page_fingerprint=None):
+        """
+        Remembers the fingerprints of the row saved for 'course_id' and returns
+        how it compares with last time (CHANGE_NEW, CHANGE_CHANGED or CHANGE_SAME).
+        Call it once the row is really saved. Without a page fingerprint (e.g.
+        the page was read inside Chrome), the one from last time is kept.
+        """
+        record_hash = record_fingerprint(record)
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute("SELECT page_hash, record_hash FROM fingerprints WHERE scope = ? AND course_id = ?",
+                                   (self.scope, str(course_id))).fetchone()
+            if row is None:
+                change = CHANGE_NEW
+            elif row[1] != record_hash:
+                change = CHANGE_CHANGED
+            else:
+                change = CHANGE_SAME
+            page_hash = page_fingerprint or (row[0] if row else None)
+            last_changed = now if change != CHANGE_SAME else None
+            self._db.execute(
+                "INSERT INTO fingerprints (scope, course_id, page_hash, record_hash, last_checked, last_changed)"
+                " VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (scope, course_id) DO UPDATE SET"
+                " page_hash = excluded.page_hash, record_hash = excluded.record_hash,"
+                " last_checked = excluded.last_checked, last_changed = COALESCE(?, last_changed)",
+                (self.scope, str(course_id), page_hash, record_hash, now, now, last_changed),
+            )
+            self.changes[str(course_id)] = change
+        return change
+
+    def gone(self, course_id):
+        """Forgets 'course_id' when its page is empty now. Returns True if it had a course last time."""
+        with self._lock, self._db:
+            removed = self._db.execute("DELETE FROM fingerprints WHERE scope = ? AND course_id = ?",
+                                       (self.scope, str(course_id))).rowcount
+            if removed:
+                self.changes[str(course_id)] = CHANGE_GONE
+        return bool(removed)
+
+    def summary(self):
+        """Returns a Counter of how the IDs of this run compare with the last run."""
+        with self._lock:
+            return Counter(self.changes.values())
+
+    def write_report(self, path):
+        """Writes the IDs that are new, changed or gone on this run to a CSV file (ID, Change)."""
+        with self._lock:
+            changed = [(course_id, change) for course_id, change in self.changes.items() if change != CHANGE_SAME]
+        with open(path, "w", encoding="utf-8", newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["ID", "Change"])
+            writer.writerows(changed)
+        return len(changed)
+
+
+def report_changes(changes):
+    """Prints how this run compares with the last one and lists the changed IDs in the report file."""
+    counts = changes.summary()
+    if not counts:
+        return
+    listed = changes.write_report(changes.report_file) if changes.report_file else 0
+    print(f"[+] Compared with the last run: {counts[CHANGE_NEW]} new, {counts[CHANGE_CHANGED]} changed, "
+          f"{counts[CHANGE_GONE]} gone, {counts[CHANGE_SAME]} unchanged"
+          + (f" (listed in {changes.report_file})" if listed else ""))
@@ -0,0 +1,158 @@
+# ==============================================================================
+# PENERAJU CHECKPOINTS (carry on where the last run stopped)
+# ==============================================================================
+# The scrapers used to start again from 'start_id' every time. After a crash,
+# a closed laptop or Ctrl+C, the user could either visit every page again, or
+# end up with the same ID twice in 'output.csv' (which is only ever added to).
+#
+# This file keeps a "checkpoint": for every ID of the run it writes down how it
+# went and when:
+#     "done"    : a row was written to output.csv
+#     "empty"   : there is no course with this ID
+#     "captcha" : a robot check was in the way
+#     "error"   : something went wrong (time-out, lost connection...)
+# Each note is saved straight away in a small database, in one go, so
+# stopping the script at any moment loses at most the pages being visited
+# at that moment.
+#
+# When a scraper starts while an unfinished checkpoint is waiting, it carries
+# on: it skips the IDs that are "done" or "empty" and the IDs that already
+# have a row in output.csv (a row can be saved just before a crash, before its
+# note). Only the rest are visited again.
+# Once every ID of the range is done, the checkpoint is cleared. The next run
+# then visits every ID again (for example to look for new or updated courses);
+# output.csv is only checked while carrying on an unfinished run.
+#
+# The settings live in the "checkpoint" part of config.kml:
+#     "enabled" : true / false
+#     "file"    : the database file to keep the checkpoint in
+#
+# The scrapers also accept --start-over to ignore the checkpoint and output.csv
+# and visit every ID again.
+# ==============================================================================
+
+# ------------------------------------------------------------------------------
+# 1. IMPORTING REQUIRED TOOLKITS
+# ------------------------------------------------------------------------------
+import csv          # Helps us read the IDs already in output.csv
+import time         # Helps us note when each ID was visited
+from store import SqliteStore, resolve_path, section_settings
+
+# ------------------------------------------------------------------------------
+# 2. SETTINGS
+# ------------------------------------------------------------------------------
+DEFAULT_CHECKPOINT_SETTINGS = {
+    "enabled": True,
+    "file": "checkpoint.sqlite",
+}
+
+# How one ID went
+STATUS_DONE = "done"
+STATUS_EMPTY = "empty"
+STATUS_CAPTCHA = "captcha"
+STATUS_ERROR = "error"
+
+# IDs with these notes are not visited again when the run carries on
+FINISHED_STATUSES = (STATUS_DONE, STATUS_EMPTY)
+
+
+def add_checkpoint_arguments(parser):
+    """Adds the --start-over switch to a script's argument parser."""
+    parser.add_argument("--start-over", action="store_true",
+                        help="Visit every ID again, ignoring the checkpoint and the IDs already in output.csv")
+
+
+def ids_in_output(output_file, id_column="ID"):
+    """Returns the IDs (as text) that already have a row in the output file."""
+    try:
+        with open(output_file, "r", encoding="utf-8", newline='') as f:
+            return {row[id_column] for row in csv.DictReader(f) if row.get(id_column)}
+    except (OSError, csv.Error):
+        return set()
+
+# ------------------------------------------------------------------------------
+# 3. THE CHECKPOINT
+# ------------------------------------------------------------------------------
+
+class Checkpoint(SqliteStore):
+    """
+    How every ID of a run went, kept in an SQLite database. 'scope' is the
+    name of the scraper, so the scrapers don't mix up each other's notes.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS progress ("
+        " scope TEXT NOT NULL, course_id TEXT NOT NULL, status TEXT NOT NULL,"
+        " updated_at REAL NOT NULL, PRIMARY KEY (scope, course_id))",
+    )
+
+    def __init__(self, path, scope):
+        self.scope = scope
+        super().__init__(path)
+
+    @classmethod
+    def from_config(cls, config, scope, base_dir=None):
+        """Opens the checkpoint described in config.kml, or returns None if it is switched off."""
+        settings = section_settings(config, "checkpoint", DEFAULT_CHECKPOINT_SETTINGS)
+        if not settings["enabled"]:
+            return None
+        return cls(resolve_path(settings["file"], base_dir), scope)
+
+    def mark(self, course_id, status):
+        """Writes down how one ID went (saved to disk straight away)."""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO progress (scope, course_id, status, updated_at) VALUES (?, ?, ?, ?)",
+                (self.scope, str(course_id), status, time.time()),
+            )
+
+    def statuses(self):
+        """Returns {id (as text): status} for every ID written down so far."""
+        with self._lock:
+            rows = self._db.execute("SELECT course_id, status FROM progress WHERE scope = ?", (self.scope,))
+            return dict(rows.fetchall())
+
+    def outstanding(self, ids, output_file=None):
+        """
+        Returns the IDs still to visit (in their original order). Without an
+        unfinished checkpoint that is every ID; otherwise the ones not finished
+        yet and without a row in 'output_file'.
+        """
+        statuses = self.statuses()
+        if not statuses:
+            return list(ids)
+        in_output = ids_in_output(output_file) if output_file else set()
+        return [course_id for course_id in ids
+                if statuses.get(str(course_id)) not in FINISHED_STATUSES and str(course_id) not in in_output]
+
+    def forget(self):
+        """Clears the checkpoint, so the next run visits every ID again."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM progress WHERE scope = ?", (self.scope,))
+
+    def forget_if_complete(self, ids):
+        """Clears the checkpoint if every one of 'ids' is finished. Returns True if it did."""
+        statuses = self.statuses()
+        if all(statuses.get(str(course_id)) in FINISHED_STATUSES for course_id in ids):
+            self.forget()
+            return True
+        return False
+
+
+def plan_run(checkpoint, ids, output_file, start_over=False):
+    """
+    Returns the IDs this run should visit. Without a checkpoint, with
+    --start-over, or when the last run finished, that is every ID; otherwise
+    (carrying on an unfinished run) only the ones still outstanding.
+    """
+    ids = list(ids)
+    if checkpoint is None:
+        return ids
+    if start_over:
+        checkpoint.forget()
+        return ids
+    remaining = checkpoint.outstanding(ids, output_file)
+    if len(remaining) < len(ids):
+        print(f"[+] Carrying on from the last run: {len(ids) - len(remaining)} of {len(ids)} IDs "
+              f"are already done, {len(remaining)} to go (use --start-over to visit them all again)")
+    return remaining
@@ -0,0 +1,339 @@
+# ==============================================================================
+# PENERAJU ID DISCOVERY (find where the courses are before scraping)
+# ==============================================================================
+# 'config.kml' asks you to guess the "start_id" and "end_id". Guess too low and
+# new courses are missed; guess too high and hours are spent on empty pages.
+#
+# This script looks at the website's ID numbers BEFORE the real scraping, with
+# as few page visits as possible:
+#
+#   1. HIGHEST LIVE ID : it jumps ahead in bigger and bigger steps (1, 2, 4,
+#      8... blocks) until it finds nothing a few times in a row, then halves
+#      the gap again and again ("binary search") to pin down the highest ID
+#      that has a course. Every probe looks at a few IDs next to each other
+#      ("probe_width"), so a small hole between courses is not mistaken for
+#      the end. If the jumps find no course at all (the courses sit in a small
+#      stretch that every jump stepped over), it looks again at one probe in
+#      every block of "block_size" IDs, and jumps ahead from the first course
+#      that turns up.
+#   2. DENSITY         : it splits the IDs up to the furthest jump into blocks
+#      and visits a few random IDs in each block, to see how full every block
+#      is. This also finds courses behind a big hole that the jumps stepped over.
+#   3. CRAWL PLAN      : blocks with courses (and their neighbours) are scraped
+#      completely, fullest first; blocks where nothing was found are only
+#      visited every few IDs, in case a lonely course hides there.
+#
+# The plan is saved as a JSON file that the scrapers can follow:
+#     python discovery.py --output crawl_plan.json
+#     python scraper_71.py --plan crawl_plan.json
+#
+# The settings live in the "discovery" part of config.kml:
+#     "start_id"          : the first ID to look at
+#     "max_id"            : never look beyond this ID
+#     "probe_width"       : how many IDs next to each other one probe looks at
+#     "empty_probes"      : how many empty jumps in a row mean "this is the end"
+#     "block_size"        : how many IDs make one block
+#     "samples_per_block" : how many random IDs are visited in each block
+#     "sparse_stride"     : in empty blocks, only every this-many-th ID is planned
+#
+# To try it out without touching the real website, run the stand-in website
+# (standin_server.py) and point discovery at it with --url.
+# ==============================================================================
+
+# ------------------------------------------------------------------------------
+# 1. IMPORTING REQUIRED TOOLKITS
+# ------------------------------------------------------------------------------
+import argparse     # Helps us read the options typed after the script name
+import json         # Helps us save the crawl plan as a JSON file
+import os           # Helps us work with files and folders on your computer
+import random       # Helps us pick random IDs to sample in each block
+import time         # Helps us measure time and note when the plan was made
+from functools import partial  # Helps us fill in the fixed details of each page visit
+import requests     # Helps us talk to the website
+from extraction import load_config, compile_page_rules, classify_page, PAGE_VALID, PAGE_CAPTCHA
+from rate_limiter import AdaptiveRateLimiter
+from store import section_settings
+
+# ------------------------------------------------------------------------------
+# 2. SETTINGS
+# ------------------------------------------------------------------------------
+DEFAULT_DISCOVERY_SETTINGS = {
+    "start_id": 1,
+    "max_id": 1000000,
+    "probe_width": 5,
+    "empty_probes": 2,
+    "block_size": 100,
+    "samples_per_block": 5,
+    "sparse_stride": 10,
+}
+
+
+class DiscoveryBlocked(Exception):
+    """The website showed a robot check, so nothing can be learned from it right now."""
+
+
+def add_plan_arguments(parser):
+    """Adds the --plan option to a scraper's argument parser."""
+    parser.add_argument("--plan", help="Scrape the IDs of a crawl plan made by discovery.py (instead of a start and end ID)")
+
+
+def load_plan_ids(path):
+    """Returns the IDs of a crawl plan file, in the order they should be scraped."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [int(course_id) for course_id in json.load(f)["ids"]]
+
+# ------------------------------------------------------------------------------
+# 3. LOOKING AT ONE ID AT A TIME
+# ------------------------------------------------------------------------------
+
+class IdProber:
+    """
+    Answers "does this ID have a course?" using fetch(course_id), which returns
+    the kind of page (see extraction.classify_page). Every ID is only ever
+    visited once; the answers are remembered in 'seen'.
+    """
+
+    def __init__(self, fetch):
+        self.fetch = fetch
+        self.seen = {}
+
+    @property
+    def visits(self):
+        return len(self.seen)
+
+    def is_live(self, course_id):
+        if course_id not in self.seen:
+            page_kind = self.fetch(course_id)
+            if page_kind == PAGE_CAPTCHA:
+                raise DiscoveryBlocked(f"Robot check (CAPTCHA) while looking at ID {course_id}")
+            self.seen[course_id] = page_kind == PAGE_VALID
+        return self.seen[course_id]
+
+    def live_near(self, course_id, width):
+        """True if any of the 'width' IDs starting at course_id has a course."""
+        return any(self.is_live(each) for each in range(course_id, course_id + width))
+
+# ------------------------------------------------------------------------------
+# 4. THE THREE STEPS
+# ------------------------------------------------------------------------------
+
+def find_highest_live_id(prober, start_id, max_id, width, empty_probes=2):
+    """
+    Jumps ahead in doubling steps until 'empty_probes' probes in a row find
+    nothing, then halves the gap after the last probe that found a course.
+    Returns (highest ID with a course or None, furthest ID the jumps reached).
+    A stretch of 'width' or more empty IDs past the last course is taken as the end.
+    """
+    width = max(1, width)
+    step = width
+    last_live = None        # A probe position known to have a course close after it
+    first_dead = None       # The first empty probe after it
+    empty_in_a_row = 0
+    furthest = start_id
+    position = start_id
+    # Jump ahead in bigger and bigger steps until the probes keep finding nothing
+    while position <= max_id:
+        furthest = min(position + width - 1, max_id)
+        if prober.live_near(position, width):
+            last_live, first_dead, empty_in_a_row = position, None, 0
+        elif last_live is not None:
+            first_dead = position if first_dead is None else first_dead
+            empty_in_a_row += 1
+            if empty_in_a_row >= max(1, empty_probes):
+                break
+        position += step
+        step *= 2
+    if last_live is None:
+        return None, furthest
+    first_dead = max_id + 1 if first_dead is None else first_dead
+
+    # Halve the gap between the last probe with a course and the first without
+    while first_dead - last_live > width:
+        middle = (last_live + first_dead) // 2
+        if prober.live_near(middle, width):
+            last_live = middle
+        else:
+            first_dead = middle
+
+    # The highest course is now at most 'width' IDs before the first empty probe
+    for course_id in range(min(first_dead, max_id + 1) - 1, last_live - 1, -1):
+        if prober.is_live(course_id):
+            return course_id, furthest
+    return None, furthest
+
+
+def find_first_live(prober, start_id, end_id, width, stride):
+    """
+    Looks at one probe of 'width' IDs every 'stride' IDs, from start_id up to
+    end_id, and returns the position of the first probe with a course (or None).
+    """
+    for position in range(start_id, end_id + 1, max(1, stride)):
+        if prober.live_near(position, min(width, end_id - position + 1)):
+            return position
+    return None
+
+
+def sample_blocks(prober, start_id, end_id, block_size, samples_per_block, seed=None):
+    """
+    Splits start_id..end_id into blocks and visits a few random IDs in each.
+    IDs already visited while searching count as samples too.
+    Returns a list of blocks: {"start", "end", "sampled", "live", "density"}.
+    """
+    chooser = random.Random(seed)
+    blocks = []
+    for block_start in range(start_id, end_id + 1, block_size):
+        block_end = min(block_start + block_size - 1, end_id)
+        ids = range(block_start, block_end + 1)
+        for course_id in chooser.sample(ids, min(samples_per_block, len(ids))):
+            prober.is_live(course_id)
+        known = [prober.seen[course_id] for course_id in ids if course_id in prober.seen]
+        live = sum(known)
+        blocks.append({"start": block_start, "end": block_end, "sampled": len(known), "live": live,
+                       "density": round(live / len(known), 3) if known else 0.0})
+    return blocks
+
+
+def make_crawl_plan(blocks, sparse_stride):
+    """
+    Decides what to scrape: every ID of the blocks where courses were found
+    (fullest blocks first), and every 'sparse_stride'-th ID of the empty ones.
+    A block that looked empty but sits next to a block with courses is crawled
+    too, as a few samples can easily miss the courses of a thin block.
+    Returns the blocks (with their "action") and the IDs in scraping order.
+    """
+    sparse_stride = max(1, sparse_stride)
+    for position, block in enumerate(blocks):
+        neighbours = blocks[max(0, position - 1):position + 2]
+        block["action"] = "crawl" if any(each["live"] for each in neighbours) else "sample"
+    ids = []
+    for block in sorted(blocks, key=lambda block: (block["action"] != "crawl", -block["density"])):
+        stride = 1 if block["action"] == "crawl" else sparse_stride
+        ids.extend(range(block["start"], block["end"] + 1, stride))
+    return blocks, ids
+
+
+def discover(fetch, settings, seed=None):
+    """
+    Runs the three steps with fetch(course_id) -> kind of page, and returns the
+    crawl plan as a dictionary (ready to be saved as JSON).
+    """
+    prober = IdProber(fetch)
+    start_id = settings["start_id"]
+    highest, furthest = find_highest_live_id(prober, start_id, settings["max_id"], settings["probe_width"],
+                                             settings["empty_probes"])
+    if highest is None:
+        # The jumps can step over a small stretch of courses: look in every block instead
+        print(f"[!] The jumps found no course; looking at one probe in every {settings['block_size']} IDs "
+              f"(this can take a while; lower \"max_id\" to stop sooner)")
+        first = find_first_live(prober, start_id, settings["max_id"], settings["probe_width"],
+                                settings["block_size"])
+        if first is not None:
+            highest, furthest = find_highest_live_id(prober, first, settings["max_id"], settings["probe_width"],
+                                                     settings["empty_probes"])
+    if highest is None:
+        print(f"[-] No course found between ID {start_id} and {settings['max_id']}")
+    else:
+        print(f"[+] Highest ID with a course: {highest} (found with {prober.visits} page visits)")
+    blocks, ids = [], []
+    if highest is not None:
+        # Sample up to the furthest jump, in case courses hide behind a big hole
+        blocks = sample_blocks(prober, start_id, furthest, max(1, settings["block_size"]),
+                               settings["samples_per_block"], seed)
+        behind_hole = max(course_id for course_id, live in prober.seen.items() if live)
+        if behind_hole > highest:
+            # Pin down the end again, from the furthest course the samples found
+            highest, _ = find_highest_live_id(prober, behind_hole, furthest, settings["probe_width"],
+                                              settings["empty_probes"])
+            print(f"[+] Sampling found courses behind a hole; the highest ID with a course is {highest}")
+        # Blocks after the highest course are left out of the plan
+        blocks = [block for block in blocks if block["start"] <= highest]
+        blocks, ids = make_crawl_plan(blocks, settings["sparse_stride"])
+    return {
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "start_id": start_id,
+        "highest_live_id": highest,
+        "page_visits": prober.visits,
+        "blocks": blocks,
+        "ids": ids,
+    }
+
+# ------------------------------------------------------------------------------
+# 5. RUNNING IT FROM THE COMMAND LINE
+# ------------------------------------------------------------------------------
+
+def fetch_page_kind(session, url_template, page_rules, limiter, course_id):
+    """
+    Visits one ID with a requests session, keeping to the speed limit, and
+    returns the kind of page (see extraction.classify_page), or None on an error.
+    """
+    limiter.wait()
+    started = time.monotonic()
+    try:
+        response = session.get(url_template.replace("{var_id}", str(course_id)), timeout=10)
+    except requests.RequestException as e:
+        # Counted as "no course": one lost page should not stop the search
+        print(f"[-] ID {course_id}: Error - {e}")
+        limiter.record(status_code=503, latency=time.monotonic() - started)
+        return None
+    page_kind = classify_page(response.content, page_rules, response.status_code)
+    limiter.record(status_code=response.status_code, latency=time.monotonic() - started,
+                   captcha=page_kind == PAGE_CAPTCHA, retry_after=response.headers.get("Retry-After"))
+    return page_kind
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Find where the course IDs are and make a crawl plan")
+    parser.add_argument("--config", help="Settings file to use (default: config.kml next to this script)")
+    parser.add_argument("--url", help="Link to use, with {var_id} for the ID (default: 'url_template' in config.kml)")
+    parser.add_argument("--start", type=int, help="First ID to look at (overrides 'start_id' in the \"discovery\" part)")
+    parser.add_argument("--max-id", type=int, help="Never look beyond this ID (overrides 'max_id')")
+    parser.add_argument("--rate", type=float, help="Pages per second to start with (default: the \"rate_limit\" part)")
+    parser.add_argument("--cookie", help="Cookie string to send, if the website shows robot checks")
+    parser.add_argument("--seed", type=int, help="Fixed random seed, so the same IDs are sampled every time")
+    parser.add_argument("--output", default="crawl_plan.json", help="File to save the plan to (default: crawl_plan.json)")
+    return parser.parse_args()
+
+
+def main():
+    print("--- Peneraju ID Discovery ---")
+    args = parse_args()
+    config_path = args.config or os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.kml")
+    config = load_config(config_path) if os.path.isfile(config_path) else {}
+    settings = section_settings(config, "discovery", DEFAULT_DISCOVERY_SETTINGS)
+    if args.start is not None:
+        settings["start_id"] = args.start
+    if args.max_id is not None:
+        settings["max_id"] = args.max_id
+
+    url_template = args.url or config.get("url_template", "https://peneraju.org/course-details?id={var_id}")
+    page_rules = compile_page_rules(config)
+    # Discovery visits pages too, so it keeps to the same speed limit as the scrapers
+    limiter = AdaptiveRateLimiter.from_config(config, start_rate=args.rate)
+    session = requests.Session()
+    session.headers["User-Agent"] = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                                     "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+    if args.cookie:
+        session.headers["Cookie"] = args.cookie
+
+    fetch = partial(fetch_page_kind, session, url_template, page_rules, limiter)
+
+    print(f"[+] Looking for courses from ID {settings['start_id']} at {url_template}")
+    try:
+        plan = discover(fetch, settings, seed=args.seed)
+    except DiscoveryBlocked as e:
+        print(f"[-] {e}. Solve it in your browser and pass your cookie with --cookie.")
+        return
+    except KeyboardInterrupt:
+        print("\nStopped by user.")
+        return
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(plan, f, indent=2)
+    crawled = sum(1 for block in plan["blocks"] if block["action"] == "crawl")
+    print(f"[+] {crawled} of {len(plan['blocks'])} blocks are crawled in full; the plan has {len(plan['ids'])} IDs "
+          f"({plan['page_visits']} pages visited to make it)")
+    print(f"[+] Plan saved to {args.output}. Use it with: python scraper_71.py --plan {args.output}")
+
+
+if __name__ == "__main__":
+    main()
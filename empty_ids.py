@@ -0,0 +1,135 @@
+# ==============================================================================
+# PENERAJU EMPTY-ID MEMORY (a "negative cache")
+# ==============================================================================
+# Most course IDs on the website have no course behind them. Every run still
+# visited every one of them, each costing a full page visit plus the wait of
+# the speed limit, only to find "No info found" again.
+#
+# This file remembers which IDs were empty, and when they were last checked.
+# A remembered ID is skipped until it is due for a re-check:
+#   - the first re-check comes after "recheck_after_hours",
+#   - every time the ID is still empty, the wait is multiplied by
+#     "backoff_factor" (24 hours, then 48, then 96...), because an ID that has
+#     been empty for months is unlikely to get a course tomorrow,
+#   - but never longer than "max_recheck_days".
+# As soon as a course shows up on an ID, that ID is forgotten.
+#
+# The memory is shared by all scrapers (it is kept per website link, not per
+# scraper). The settings live in the "empty_ids" part of config.kml:
+#     "enabled"             : true / false
+#     "file"                : the database file to keep the memory in
+#     "recheck_after_hours" : how long to skip an ID after it was first found empty
+#     "backoff_factor"      : how much longer to wait after every empty re-check
+#     "max_recheck_days"    : the longest an ID is ever skipped
+#
+# The scrapers also accept --recheck-empty to visit the remembered IDs anyway.
+# ==============================================================================
+
+# ------------------------------------------------------------------------------
+# 1. IMPORTING REQUIRED TOOLKITS
+# ------------------------------------------------------------------------------
+import time         # Helps us note when each ID was checked
+from checkpoint import STATUS_DONE, STATUS_EMPTY
+from store import SqliteStore, resolve_path, section_settings
+
+# ------------------------------------------------------------------------------
+# 2. SETTINGS
+# ------------------------------------------------------------------------------
+DEFAULT_EMPTY_ID_SETTINGS = {
+    "enabled": True,
+    "file": "empty_ids.sqlite",
+    "recheck_after_hours": 24,
+    "backoff_factor": 2.0,
+    "max_recheck_days": 30,
+}
+
+
+def add_empty_id_arguments(parser):
+    """Adds the --recheck-empty switch to a script's argument parser."""
+    parser.add_argument("--recheck-empty", action="store_true",
+                        help="Also visit the IDs that were empty last time, even if they are not due for a re-check")
+
+# ------------------------------------------------------------------------------
+# 3. THE MEMORY OF EMPTY IDs
+# ------------------------------------------------------------------------------
+
+class EmptyIdCache(SqliteStore):
+    """
+    The IDs found empty, kept in an SQLite database. 'scope' is the website
+    link the IDs belong to (for example the "url_template" from config.kml).
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS empty_ids ("
+        " scope TEXT NOT NULL, course_id TEXT NOT NULL, times_empty INTEGER NOT NULL,"
+        " first_empty REAL NOT NULL, last_checked REAL NOT NULL, PRIMARY KEY (scope, course_id))",
+    )
+
+    def __init__(self, path, scope, recheck_after_hours=24, backoff_factor=2.0, max_recheck_days=30):
+        self.scope = scope
+        self.recheck_after = recheck_after_hours * 3600
+        self.backoff_factor = max(1.0, backoff_factor)
+        self.max_recheck = max_recheck_days * 24 * 3600
+        super().__init__(path)
+
+    @classmethod
+    def from_config(cls, config, scope, base_dir=None):
+        """Opens the memory described in config.kml, or returns None if it is switched off."""
+        settings = section_settings(config, "empty_ids", DEFAULT_EMPTY_ID_SETTINGS)
+        if not settings["enabled"]:
+            return None
+        return cls(resolve_path(settings["file"], base_dir), scope, recheck_after_hours=settings["recheck_after_hours"],
+                   backoff_factor=settings["backoff_factor"], max_recheck_days=settings["max_recheck_days"])
+
+    def recheck_wait(self, times_empty):
+        """How many seconds to skip an ID that was found empty 'times_empty' times in a row."""
+        wait = self.recheck_after * self.backoff_factor ** max(0, times_empty - 1)
+        return min(wait, self.max_recheck) if self.max_recheck else wait
+
+    def record(self, course_id, status):
+        """
+        Learns from how one ID went: an empty page is remembered (or its wait
+        grows), a page with a course makes us forget the ID. Other outcomes
+        (robot checks, errors) say nothing about the ID, so they are ignored.
+        """
+        if status == STATUS_EMPTY:
+            now = time.time()
+            with self._lock, self._db:
+                self._db.execute(
+                    "INSERT INTO empty_ids (scope, course_id, times_empty, first_empty, last_checked)"
+                    " VALUES (?, ?, 1, ?, ?) ON CONFLICT (scope, course_id) DO UPDATE SET"
+                    " times_empty = times_empty + 1, last_checked = excluded.last_checked",
+                    (self.scope, str(course_id), now, now),
+                )
+        elif status == STATUS_DONE:
+            with self._lock, self._db:
+                self._db.execute("DELETE FROM empty_ids WHERE scope = ? AND course_id = ?",
+                                 (self.scope, str(course_id)))
+
+    def due_for_visit(self, ids, now=None):
+        """
+        Returns the IDs to visit (in their original order): every ID we don't
+        remember as empty, plus the remembered ones that are due for a re-check.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._db.execute("SELECT course_id, times_empty, last_checked FROM empty_ids WHERE scope = ?",
+                                    (self.scope,))
+            skip_until = {course_id: last_checked + self.recheck_wait(times_empty)
+                          for course_id, times_empty, last_checked in rows.fetchall()}
+        return [course_id for course_id in ids if skip_until.get(str(course_id), 0) <= now]
+
+
+def skip_known_empty(empty_ids, ids, recheck_empty=False):
+    """
+    Returns the IDs this run should visit, leaving out the IDs remembered as
+    empty that are not due for a re-check yet (unless --recheck-empty was given).
+    """
+    ids = list(ids)
+    if empty_ids is None or recheck_empty:
+        return ids
+    remaining = empty_ids.due_for_visit(ids)
+    if len(remaining) < len(ids):
+        print(f"[+] Skipping {len(ids) - len(remaining)} ID(s) that were empty last time and are not due "
+              f"for a re-check yet (use --recheck-empty to visit them anyway)")
+    return remaining
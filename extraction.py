@@ -0,0 +1,629 @@
+# ==============================================================================
+# PENERAJU EXTRACTION TOOLKIT
+# ==============================================================================
+# This file holds the "reading" part of the scraper: it takes the raw webpage
+# code (HTML) of one course page and pulls out the fields listed in
+# 'config.kml'. It does not open any browser or website by itself, so other
+# scripts (and background worker processes) can safely borrow it.
+#
+# The settings are turned ONCE into an "extraction plan" (a fixed checklist)
+# and that checklist is then re-used for every page, instead of re-reading the
+# settings file's instructions over and over for each of thousands of pages.
+# ==============================================================================
+
+# ------------------------------------------------------------------------------
+# 1. IMPORTING REQUIRED TOOLKITS
+# ------------------------------------------------------------------------------
+import json                         # Helps us read the 'config.kml' file which is written in JSON format
+import hashlib                      # Helps us make a short code for a set of field rules
+from collections import namedtuple  # Helps us create small, read-only records
+from bs4 import BeautifulSoup       # Helps us read and search through the website's text
+
+# ------------------------------------------------------------------------------
+# 2. PAGE READERS (the "parser backends")
+# ------------------------------------------------------------------------------
+# Turning raw HTML into something searchable is the slowest step of all. The
+# original tool always used BeautifulSoup with Python's built-in 'html.parser',
+# which is the slowest option. Here you can choose (in config.kml with
+# "parser_backend", or on the command line with --parser):
+#   - "html.parser" : BeautifulSoup + Python's reader (the original behaviour)
+#   - "lxml"        : BeautifulSoup + the much faster lxml reader
+#   - "selectolax"  : the selectolax (Lexbor) reader, no BeautifulSoup at all;
+#                     usually 10x or more faster than "html.parser"
+# Every reader offers the same small set of "questions" below, so the field
+# methods further down work the same with all of them.
+DEFAULT_PARSER_BACKEND = "html.parser"
+
+
+class SoupPage:
+    """
+    One page loaded into BeautifulSoup (used by the "html.parser" and "lxml"
+    readers). The label index is only built the first time a "generic_label"
+    field asks for it.
+    """
+
+    def __init__(self, soup):
+        self.soup = soup
+        self._label_index = None
+
+    @property
+    def label_index(self):
+        if self._label_index is None:
+            self._label_index = LabelIndex(self)
+        return self._label_index
+
+    def select_one(self, selector):
+        return self.soup.select_one(selector)
+
+    def own_string(self, node):
+        """The first piece of text sitting directly inside the block (not inside its children)."""
+        return node.find(string=True, recursive=False)
+
+    def string(self, node):
+        """The block's text, but only when the block holds exactly one piece of text."""
+        return node.string
+
+    def text(self, node):
+        """All the text inside the block, with the spaces around each piece removed."""
+        return node.get_text(strip=True)
+
+    def parent(self, node):
+        return node.parent
+
+    def attr(self, node, name, default):
+        return node.get(name, default)
+
+    def has_class(self, node, class_name):
+        return class_name in node.get('class', ())
+
+    def find_next(self, node, tag_name):
+        """The first <tag_name> anywhere after the start of this block."""
+        return node.find_next(tag_name)
+
+    def next_sibling(self, node, tag_name, class_name=None):
+        """The first <tag_name> next to this block (on the same level, further down)."""
+        if class_name:
+            return node.find_next_sibling(tag_name, class_=class_name)
+        return node.find_next_sibling(tag_name)
+
+    def label_candidates(self):
+        """Every <div>, <p> and <label> on the page, in page order (one single walk)."""
+        for tag in self.soup.find_all(['div', 'p', 'label']):
+            yield tag.name, tag
+
+
+class LexborPage(SoupPage):
+    """
+    One page loaded with selectolax's Lexbor reader. It answers the same
+    questions as SoupPage, but the searching is done by fast compiled code.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self._label_index = None
+
+    def select_one(self, selector):
+        return self.tree.css_first(selector)
+
+    def own_string(self, node):
+        for child in node.iter(include_text=True):
+            if child.tag == '-text':
+                return child.text_content
+        return None
+
+    def string(self, node):
+        # Same rule as BeautifulSoup's ".string": one single child, followed down if it is a tag
+        while node is not None:
+            children = list(node.iter(include_text=True))
+            if len(children) != 1:
+                return None
+            node = children[0]
+            if node.tag == '-text':
+                return node.text_content
+            if not node.is_element_node:
+                return None
+        return None
+
+    def text(self, node):
+        return node.text(deep=True, separator='', strip=True)
+
+    def parent(self, node):
+        return node.parent
+
+    def attr(self, node, name, default):
+        value = node.attributes.get(name, default)
+        # A bare attribute (like <a href>) has no value; BeautifulSoup calls that ""
+        return "" if value is None else value
+
+    def has_class(self, node, class_name):
+        return class_name in (node.attributes.get('class') or '').split()
+
+    def find_next(self, node, tag_name):
+        # First look inside the block itself, then everything after it, climbing up level by level
+        for inner in node.traverse(include_text=False):
+            if inner is not node and inner.tag == tag_name:
+                return inner
+        while node is not None:
+            sibling = node.next
+            while sibling is not None:
+                for inner in sibling.traverse(include_text=False):
+                    if inner.tag == tag_name:
+                        return inner
+                sibling = sibling.next
+            node = node.parent
+        return None
+
+    def next_sibling(self, node, tag_name, class_name=None):
+        sibling = node.next
+        while sibling is not None:
+            if sibling.tag == tag_name and (not class_name or self.has_class(sibling, class_name)):
+                return sibling
+            sibling = sibling.next
+        return None
+
+    def label_candidates(self):
+        for node in self.tree.css('div, p, label'):
+            yield node.tag, node
+
+
+def _load_soup_page(html_content, features):
+    return SoupPage(BeautifulSoup(html_content, features))
+
+
+def _load_lexbor_page(html_content):
+    try:
+        from selectolax.lexbor import LexborHTMLParser
+    except ImportError:
+        raise ValueError('The "selectolax" reader needs an extra toolkit: pip install selectolax')
+    return LexborPage(LexborHTMLParser(html_content))
+
+
+def _load_lxml_soup_page(html_content):
+    try:
+        import lxml  # noqa: F401  (only checking that it is installed)
+    except ImportError:
+        raise ValueError('The "lxml" reader needs an extra toolkit: pip install lxml')
+    return _load_soup_page(html_content, 'lxml')
+
+
+# The readers we know, matched to the helper that loads a page with each one
+PARSER_BACKENDS = {
+    "html.parser": lambda html_content: _load_soup_page(html_content, 'html.parser'),
+    "lxml": _load_lxml_soup_page,
+    "selectolax": _load_lexbor_page,
+}
+
+
+def load_page(html_content, backend=DEFAULT_PARSER_BACKEND):
+    """Loads the raw webpage code with the chosen reader, ready to be searched."""
+    loader = PARSER_BACKENDS.get(backend)
+    if loader is None:
+        raise ValueError(f'Unknown parser_backend "{backend}". Choose one of: {", ".join(PARSER_BACKENDS)}')
+    return loader(html_content)
+
+# ------------------------------------------------------------------------------
+# 3. THE CONTENT REGION (only read the part of the page we care about)
+# ------------------------------------------------------------------------------
+# A course page is large (about 138 KB) and full of scripts, menus and forms,
+# but everything we copy sits in the "course details" part. If config.kml has a
+# "content_region" with a "start_marker" (and optionally an "end_marker"), only
+# the text between those two markers is loaded by the page reader. This is a
+# simple, very cheap text cut made BEFORE any reading, so it works with every
+# reader. If the start marker is not on the page, the whole page is used.
+
+# The two markers, ready to be searched for in both text and raw bytes pages
+ContentRegion = namedtuple("ContentRegion", ["start", "end", "start_bytes", "end_bytes"])
+
+
+def compile_region(config):
+    """Turns the "content_region" setting into a ContentRegion (or None when it is not used)."""
+    region = config.get('content_region') or {}
+    start = region.get('start_marker')
+    if not start:
+        return None
+    end = region.get('end_marker') or None
+    return ContentRegion(
+        start=start,
+        end=end,
+        start_bytes=start.encode('utf-8'),
+        end_bytes=end.encode('utf-8') if end else None,
+    )
+
+
+def cut_region(html_content, region):
+    """
+    Returns only the part of the page between the region's markers, or None if
+    the start marker cannot be found (so the caller should use the whole page).
+    If the end marker is missing, everything after the start marker is kept.
+    """
+    if region is None:
+        return None
+    if isinstance(html_content, bytes):
+        start_marker, end_marker = region.start_bytes, region.end_bytes
+    else:
+        start_marker, end_marker = region.start, region.end
+
+    begin = html_content.find(start_marker)
+    if begin < 0:
+        return None
+    finish = html_content.find(end_marker, begin + len(start_marker)) if end_marker else -1
+    if finish < 0:
+        return html_content[begin:]
+    return html_content[begin:finish]
+
+
+# ------------------------------------------------------------------------------
+# 4. THE QUICK PAGE CHECK (done on the raw text, before any reading)
+# ------------------------------------------------------------------------------
+# Before paying for a full read of a page, we look at its raw text and sort it
+# into one of four kinds. Only VALID pages are actually read; the others are
+# answered straight away. The words we look for come from "page_rules" in
+# config.kml, so they can be changed without touching the code:
+#   "valid_markers"   : text that only appears on a real course page
+#   "captcha_markers" : text that appears on the website's robot-check page
+#   "ok_status_codes" : website answers that count as "page delivered"
+PAGE_VALID = "VALID"            # A real course page: read it
+PAGE_CAPTCHA = "CAPTCHA"        # The website thinks we are a robot
+PAGE_EMPTY = "EMPTY"            # Nothing there (no course with this ID)
+PAGE_HTTP_ERROR = "HTTP-ERROR"  # The website answered with an error code
+
+# The valid marker is kept loose on purpose: the course title can carry extra
+# classes (class="card-title mb-0"), and a real course wrongly taken for an empty
+# page would be skipped for days by the memory of empty IDs
+DEFAULT_PAGE_RULES = {
+    "valid_markers": ['card-title'],
+    "captcha_markers": ["Validation request"],
+    "ok_status_codes": [200],
+}
+
+# The rules, ready to be searched for in both text and raw bytes pages
+PageRules = namedtuple("PageRules", ["valid", "captcha", "valid_bytes", "captcha_bytes", "ok_status_codes"])
+
+
+def compile_page_rules(config):
+    """Turns the "page_rules" setting (or the defaults above) into PageRules."""
+    rules = dict(DEFAULT_PAGE_RULES)
+    rules.update(config.get('page_rules') or {})
+    valid = tuple(rules["valid_markers"])
+    captcha = tuple(rules["captcha_markers"])
+    return PageRules(
+        valid=valid,
+        captcha=captcha,
+        valid_bytes=tuple(m.encode('utf-8') for m in valid),
+        captcha_bytes=tuple(m.encode('utf-8') for m in captcha),
+        ok_status_codes=frozenset(rules["ok_status_codes"]),
+    )
+
+
+def classify_page(html_content, rules, status_code=None):
+    """
+    Sorts a page into PAGE_VALID, PAGE_CAPTCHA, PAGE_EMPTY or PAGE_HTTP_ERROR by
+    looking at its raw text only. 'rules' is a PageRules, or an ExtractionPlan
+    (whose page rules are then used). 'status_code' is the website's answer
+    code when we have one (the browser does not tell us, so it can be left out).
+    """
+    if isinstance(rules, ExtractionPlan):
+        rules = rules.page_rules
+    if status_code is not None and status_code not in rules.ok_status_codes:
+        return PAGE_HTTP_ERROR
+    if not html_content or not html_content.strip():
+        return PAGE_EMPTY
+
+    if _contains_any(html_content, rules.valid, rules.valid_bytes):
+        return PAGE_VALID
+    if _contains_any(html_content, rules.captcha, rules.captcha_bytes):
+        return PAGE_CAPTCHA
+    return PAGE_EMPTY
+
+
+def _contains_any(html_content, text_markers, byte_markers):
+    """True if any of the markers appears in the raw page (text or bytes)."""
+    markers = byte_markers if isinstance(html_content, bytes) else text_markers
+    return any(marker in html_content for marker in markers)
+
+
+# ------------------------------------------------------------------------------
+# 5. THE EXTRACTION PLAN (built once from config.kml)
+# ------------------------------------------------------------------------------
+
+# One line of the checklist: everything we need to know to find ONE field.
+# 'extractor' is the ready-to-use helper function for this field's method.
+FieldRule = namedtuple(
+    "FieldRule",
+    ["name", "extract", "selector", "attribute", "remove_prefix", "next_tag", "label_lower", "extractor"],
+)
+
+# The whole checklist: the list of field rules, the column order for the CSV,
+# the page reader ("parser backend") used to load each page, the content
+# region to cut out before reading (or None to read whole pages) and the rules
+# for the quick page check.
+ExtractionPlan = namedtuple("ExtractionPlan", ["fields", "fieldnames", "backend", "region", "page_rules"])
+
+
+def _extract_text(page, rule):
+    """Method 1: finding straight text inside a specific code block."""
+    element = page.select_one(rule.selector)
+    if element is not None:
+        t = page.own_string(element)
+        return t.strip() if t and t.strip() else page.text(element)
+    return "N/A"
+
+
+def _extract_parent_text(page, rule):
+    """Method 2: finding text slightly outside the specific code block."""
+    element = page.select_one(rule.selector)
+    if element is not None:
+        parent = page.parent(element)
+        if parent is not None:
+            return page.text(parent)
+    return "N/A"
+
+
+def _extract_attribute(page, rule):
+    """Method 3: finding hidden links or attributes (like website addresses or mailto links)."""
+    element = page.select_one(rule.selector)
+    if element is not None:
+        val = page.attr(element, rule.attribute, "")
+        if val:
+            if rule.remove_prefix:  # E.g., removing "mailto:" from an email link
+                val = val.replace(rule.remove_prefix, "")
+            return val.strip()
+    return "N/A"
+
+
+def _extract_next_tag_attribute(page, rule):
+    """Method 4: finding a link directly after a specific block."""
+    element = page.select_one(rule.selector)
+    if element is not None:
+        link = page.find_next(element, rule.next_tag)
+        if link is not None:
+            return page.attr(link, rule.attribute, "N/A").strip()
+    return "N/A"
+
+
+def _extract_generic_label(page, rule):
+    """Method 5: finding data matching a standard label block on the website."""
+    return page.label_index.find(rule.label_lower)
+
+
+def _extract_missing_selector(page, rule):
+    """Used when a field needs a selector but none was given: nothing can be found."""
+    return "N/A"
+
+
+# The list of methods we know, matched to the helper that performs each one.
+# Methods 1 to 4 need a 'selector' in config.kml to know where to look.
+EXTRACTORS = {
+    "text": _extract_text,
+    "parent_text": _extract_parent_text,
+    "attribute": _extract_attribute,
+    "next_tag_attribute": _extract_next_tag_attribute,
+    "generic_label": _extract_generic_label,
+}
+SELECTOR_METHODS = ("text", "parent_text", "attribute", "next_tag_attribute")
+
+
+def load_config(config_file="config.kml"):
+    """
+    This function looks for your settings file (config.kml) and reads the instructions inside it.
+    If it can't find the file or the file is broken, it will let you know.
+    """
+    try:
+        # Open the settings file in "read" mode
+        with open(config_file, "r", encoding="utf-8") as f:
+            return json.load(f) # Convert the file's text into an organized setting our script can use
+    except Exception as e:
+        # If something goes wrong, print an error message on the screen
+        print(f"[-] Error loading {config_file}: {e}")
+        return None
+
+
+def compile_plan(config, backend=None):
+    """
+    This function reads the 'fields' section of the settings ONCE and turns it
+    into a ready-made checklist (an ExtractionPlan) that parse_html can follow
+    quickly on every page. The checklist cannot be changed afterwards, so it is
+    safe to share between many pages and worker processes.
+    'backend' picks the page reader; if it is not given, the "parser_backend"
+    setting from config.kml is used (or "html.parser" when there is none).
+    """
+    backend = backend or config.get('parser_backend') or DEFAULT_PARSER_BACKEND
+    load_page("<html></html>", backend)  # Fails straight away if the reader is unknown or not installed
+
+    # Get the list of information we want to find from the settings file
+    fields_to_extract = list(config.get('fields', []))
+
+    # If the settings file uses an older format ('labels' instead of 'fields'), fix it
+    if not fields_to_extract:
+        for l in config.get('labels', []):
+            fields_to_extract.append({"name": l, "extract": "generic_label"})
+
+    rules = []
+    for field in fields_to_extract:
+        label_name = field.get("name")
+        extract_type = field.get("extract", "generic_label")
+        selector = field.get("selector")
+
+        extractor = EXTRACTORS.get(extract_type)
+        if extractor is None or (extract_type in SELECTOR_METHODS and not selector):
+            # Unknown method, or a method that needs a selector without one: always "N/A"
+            extractor = _extract_missing_selector
+
+        rules.append(FieldRule(
+            name=label_name,
+            extract=extract_type,
+            selector=selector,
+            attribute=field.get("attribute", "href"),
+            remove_prefix=field.get("remove_prefix"),
+            next_tag=field.get("next_tag", "a"),
+            label_lower=(label_name or "").lower(),
+            extractor=extractor,
+        ))
+
+    # Column headers for the CSV file, without duplicates (like two 'Phone' columns)
+    fieldnames = []
+    for name in ['ID'] + [r.name for r in rules]:
+        if name not in fieldnames:
+            fieldnames.append(name)
+
+    return ExtractionPlan(
+        fields=tuple(rules),
+        fieldnames=tuple(fieldnames),
+        backend=backend,
+        region=compile_region(config),
+        page_rules=compile_page_rules(config),
+    )
+
+
+def plan_signature(plan):
+    """
+    A short code that changes whenever the field rules change (a field added,
+    removed, renamed or read differently). Whatever was saved with one set of
+    rules is labelled with it, so it is never taken for the result of another.
+    """
+    rules = [[rule.name, rule.extract, rule.selector, rule.attribute, rule.remove_prefix, rule.next_tag]
+             for rule in plan.fields]
+    return hashlib.sha1(json.dumps(rules).encode("utf-8")).hexdigest()[:12]
+
+
+# ------------------------------------------------------------------------------
+# 6. THE LABEL INDEX (one walk through the page for all "generic_label" fields)
+# ------------------------------------------------------------------------------
+
+class LabelIndex:
+    """
+    Walks through the page ONCE and writes down every label we could be asked
+    about, in the three layouts the website uses:
+      - <div class="label">Method</div> followed by <div class="value">
+      - <p>Method</p> followed by another <p>
+      - <label>Issuer</label> followed by a <span> (or a <div>)
+    After that, each "generic_label" field is answered from these notes instead
+    of searching the whole page again. The matching rules are the same as before:
+    the name only has to appear INSIDE a div/label text, but must be EXACTLY the
+    text of a <p>. Upper/lower case never matters.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.div_labels = []    # (lower-case text, tag) for every <div class="label">, in page order
+        self.p_labels = {}      # lower-case text -> the FIRST <p> with exactly that text
+        self.label_tags = []    # (lower-case text, tag) for every <label>, in page order
+        self._answers = {}      # Values we already worked out, so asking twice is free
+
+        # One single walk over the page, picking up the three kinds of tags at once
+        for name, tag in page.label_candidates():
+            if name == 'p':
+                text = page.text(tag).lower()
+                if text not in self.p_labels:
+                    self.p_labels[text] = tag
+            elif name == 'div':
+                if page.has_class(tag, 'label'):
+                    string = page.string(tag)
+                    if string:
+                        self.div_labels.append((string.lower(), tag))
+            else:
+                string = page.string(tag)
+                if string:
+                    self.label_tags.append((string.lower(), tag))
+
+    def find(self, label_name, layouts=("div", "p", "label")):
+        """
+        Returns the value shown next to 'label_name' on the page, or "N/A".
+        'layouts' picks which of the three page layouts may be used, in order.
+        """
+        label_lower = label_name.lower()
+        key = (label_lower, layouts)
+        if key not in self._answers:
+            self._answers[key] = self._lookup(label_lower, layouts)
+        return self._answers[key]
+
+    def _lookup(self, label_lower, layouts):
+        page = self.page
+        for layout in layouts:
+            if layout == "div":
+                # The first <div class="label"> that contains our name
+                label_div = _first_containing(self.div_labels, label_lower)
+                if label_div is not None:
+                    value_div = page.next_sibling(label_div, 'div', 'value')
+                    if value_div is not None:
+                        return page.text(value_div)
+
+            elif layout == "p":
+                # The first <p> whose whole text is our name
+                label_p = self.p_labels.get(label_lower)
+                if label_p is not None:
+                    value_p = page.next_sibling(label_p, 'p')
+                    if value_p is not None:
+                        return page.text(value_p)
+
+            elif layout == "label":
+                # The first <label> that contains our name
+                label_tag = _first_containing(self.label_tags, label_lower)
+                if label_tag is not None:
+                    value_span = page.next_sibling(label_tag, 'span')
+                    if value_span is not None:
+                        return page.text(value_span)
+                    value_div = page.next_sibling(label_tag, 'div')
+                    if value_div is not None:
+                        return page.text(value_div)
+        return "N/A"
+
+
+def _first_containing(entries, label_lower):
+    """Returns the first tag from a list of (text, tag) pairs whose text contains the name."""
+    for text, tag in entries:
+        if label_lower in text:
+            return tag
+    return None
+
+
+# ------------------------------------------------------------------------------
+# 7. READING ONE PAGE
+# ------------------------------------------------------------------------------
+
+def parse_html(html_content, course_id, config):
+    """
+    This function takes the raw webpage code (HTML) and uses your settings to find
+    the specific pieces of information you want (like 'Programme Name', 'Duration', etc.).
+    'config' can be the settings loaded from config.kml or, faster, a plan that
+    was already made with compile_plan().
+    """
+    plan = config if isinstance(config, ExtractionPlan) else compile_plan(config)
+
+    # Quick check on the raw text: robot-check and empty pages are never read at all
+    page_kind = classify_page(html_content, plan.page_rules)
+    if page_kind == PAGE_CAPTCHA:
+        return "CAPTCHA" # Let the main script know we hit a robot-check
+    if page_kind != PAGE_VALID:
+        return None # Let the main script know this page is empty/invalid
+
+    # Load the webpage code with the chosen reader, making it easy to search.
+    # When a content region is set, only that part of the page is loaded.
+    title_tag = None
+    region_html = cut_region(html_content, plan.region)
+    if region_html is not None:
+        page = load_page(region_html, plan.backend)
+        title_tag = page.select_one('h5.card-title')
+
+    # No region (or no title inside it): read the whole page, just like before
+    if title_tag is None:
+        page = load_page(html_content, plan.backend)
+        title_tag = page.select_one('h5.card-title')
+
+    # Make sure the page really has the right content by looking for a hidden title box
+    if title_tag is None:
+        # If we can't find a title, check if the website thinks we are a robot (CAPTCHA/Validation)
+        if _contains_any(html_content, plan.page_rules.captcha, plan.page_rules.captcha_bytes):
+            return "CAPTCHA" # Let the main script know we hit a robot-check
+        return None # Let the main script know this page is empty/invalid
+
+    # Create an empty dictionary (like a bucket) to store the data we find
+    data = {}
+    data['ID'] = str(course_id) # Save the current ID number first
+
+    # Follow the checklist, one field at a time
+    for rule in plan.fields:
+        data[rule.name] = rule.extractor(page, rule)
+
+    # Return the bucket of data back to the main script
+    return data
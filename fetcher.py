@@ -0,0 +1,154 @@
+# ==============================================================================
+# PENERAJU PAGE FETCHER (several pages at the same time)
+# ==============================================================================
+# The original 'scraper.py' asks the website for one page, then sits idle for
+# 30 seconds, then asks for the next one. Most of the run is spent waiting.
+#
+# This file lets the tool keep a few requests "in flight" at the same time,
+# while a shared speed limit (requests per second, for ALL requests together)
+# keeps it polite to the website. The speed limit listens to the website and
+# slows down or speeds up by itself (see rate_limiter.py). Connections to the
+# website are kept open and re-used, and every request has a time limit so a
+# stuck page can't block us.
+#
+# NOTE: the pages are fetched with httpx, not with cloudscraper like the other
+# engines of scraper.py, so a Cloudflare challenge page is NOT solved here. If
+# the website starts showing one, go back to the "sequential" or "pipeline"
+# engine (both use cloudscraper).
+#
+# The settings live in the "http" part of config.kml:
+#     "concurrency"         : how many pages may be requested at the same time
+#     "requests_per_second" : the most requests per second, for all requests together
+#                             (the "rate_limit" part decides the speed below that)
+#     "timeout"             : seconds to wait for one page before giving up
+# ==============================================================================
+
+# ------------------------------------------------------------------------------
+# 1. IMPORTING REQUIRED TOOLKITS
+# ------------------------------------------------------------------------------
+import asyncio                      # Helps us wait for many pages at the same time
+import time                         # Helps us measure how long each page took
+from collections import namedtuple  # Helps us create small, read-only records
+import httpx                        # Helps us talk to the website (supports waiting on many pages)
+from extraction import classify_page, compile_page_rules, PAGE_CAPTCHA
+from rate_limiter import AdaptiveRateLimiter
+from store import section_settings
+
+# ------------------------------------------------------------------------------
+# 2. SETTINGS AND RESULTS
+# ------------------------------------------------------------------------------
+DEFAULT_HTTP_SETTINGS = {
+    "engine": "sequential",       # "sequential" (one page at a time) or "async" (several at once)
+    "concurrency": 4,
+    "requests_per_second": 0.5,
+    "timeout": 10,
+}
+
+# What we got back for one course ID. 'error' is set (and 'status_code' is None)
+# when no answer came back at all, for example after a time-out.
+FetchResult = namedtuple(
+    "FetchResult",
+    ["course_id", "url", "status_code", "content", "headers", "error", "elapsed"],
+)
+
+
+# ------------------------------------------------------------------------------
+# 3. THE FETCH ENGINE
+# ------------------------------------------------------------------------------
+
+class AsyncFetchEngine:
+    """
+    Downloads many course pages with up to 'concurrency' requests at the same
+    time, under one shared speed limit, re-using open connections. Every answer
+    is reported back to the speed limit ('limiter'); when 'page_rules' are
+    given, robot-check pages are reported as such too.
+    """
+
+    def __init__(self, headers=None, concurrency=4, requests_per_second=0.5, timeout=10,
+                 limiter=None, page_rules=None):
+        self.headers = dict(headers or {})
+        # Let httpx announce only the squeezing methods it can actually undo
+        # (it handles "br" only when the brotli toolkit is installed)
+        self.headers.pop('Accept-Encoding', None)
+        self.concurrency = max(1, int(concurrency))
+        self.requests_per_second = requests_per_second
+        self.timeout = timeout
+        self.limiter = limiter or AdaptiveRateLimiter.from_config(None, rate_cap=requests_per_second)
+        self.page_rules = page_rules
+
+    @classmethod
+    def from_config(cls, config, headers=None):
+        settings = section_settings(config, "http", DEFAULT_HTTP_SETTINGS)
+        return cls(
+            headers=headers,
+            concurrency=settings["concurrency"],
+            requests_per_second=settings["requests_per_second"],
+            timeout=settings["timeout"],
+            limiter=AdaptiveRateLimiter.from_config(config, rate_cap=settings["requests_per_second"]),
+            page_rules=compile_page_rules(config or {}),
+        )
+
+    async def _fetch_one(self, client, course_id, url, extra_headers=None):
+        await self.limiter.wait_async()
+        started = time.monotonic()
+        try:
+            response = await client.get(url, headers=extra_headers)
+        except Exception as e:
+            # Any failure (time-out, refused, a bad link...) is reported in the
+            # result: a worker that crashed would leave fetch_all waiting forever
+            elapsed = time.monotonic() - started
+            # No answer at all: treat it like a "slow down" signal
+            self.limiter.record(status_code=503, latency=elapsed)
+            return FetchResult(course_id, url, None, b"", {}, e, elapsed)
+
+        elapsed = time.monotonic() - started
+        captcha = (self.page_rules is not None
+                   and classify_page(response.content, self.page_rules, response.status_code) == PAGE_CAPTCHA)
+        self.limiter.record(status_code=response.status_code, latency=elapsed, captcha=captcha,
+                            retry_after=response.headers.get("Retry-After"))
+        return FetchResult(course_id, url, response.status_code, response.content,
+                           response.headers, None, elapsed)
+
+    async def fetch_all(self, jobs):
+        """
+        Takes a list of (course_id, url) jobs and hands back a FetchResult for
+        each one as soon as it arrives (so NOT necessarily in ID order).
+        A job may carry a third item: extra request headers for that page only
+        (for example the "has it changed?" headers from the page cache).
+        """
+        jobs = list(jobs)
+        job_queue = asyncio.Queue()
+        for job in jobs:
+            job_queue.put_nowait(job)
+        results = asyncio.Queue()
+
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(headers=self.headers, limits=limits, timeout=self.timeout,
+                                     follow_redirects=True) as client:
+
+            async def worker():
+                while True:
+                    try:
+                        course_id, url, *extra_headers = job_queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    await results.put(await self._fetch_one(client, course_id, url, *extra_headers))
+
+            workers = [asyncio.create_task(worker()) for _ in range(min(self.concurrency, len(jobs)))]
+            try:
+                for _ in range(len(jobs)):
+                    yield await results.get()
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+    def run(self, jobs, handle_result):
+        """
+        The simple way to use the engine from normal (non-async) code: downloads
+        every job and calls handle_result(result) for each page as it arrives.
+        """
+        async def _main():
+            async for result in self.fetch_all(jobs):
+                handle_result(result)
+        asyncio.run(_main())
@@ -0,0 +1,305 @@
+# ==============================================================================
+# PENERAJU PAGE CACHE (saved copies of downloaded pages)
+# ==============================================================================
+# Every run used to download every page again, even if we fetched it an hour
+# ago just to try out a change in config.kml. This file keeps a squeezed copy
+# of each downloaded page on disk, so a re-run within the "time to live" does
+# not need the website at all.
+#
+# How it is stored (in the "page_cache" folder by default):
+#   - each different page body is saved ONCE, squeezed (zlib), in a file named
+#     after its fingerprint (a SHA-256 hash): "content-addressed" storage
+#   - a small database ('index.sqlite') remembers which link (URL) points to
+#     which body, when it was fetched and when it was last used
+#   - when the folder grows above the size limit, the pages that were used
+#     least recently are removed first ("LRU")
+#   - the website's "validators" (ETag / Last-Modified) are kept with each
+#     page, so an old copy can be checked with a tiny "has it changed?"
+#     request instead of downloading it again (see conditional_headers)
+#   - a scraper may also keep the row it read from a page ("record"), so an
+#     unchanged page does not even need to be read again
+#
+# The settings live in the "cache" part of config.kml:
+#     "enabled"     : true / false
+#     "directory"   : the folder to keep the pages in
+#     "ttl_hours"   : how long a saved page counts as fresh (0 = forever)
+#     "max_size_mb" : the most disk space the saved pages may use
+#
+# The scrapers also accept two switches:
+#     --refresh     : always download again (and update the saved copies)
+#     --cache-only  : never contact the website; only use saved copies
+# ==============================================================================
+
+# ------------------------------------------------------------------------------
+# 1. IMPORTING REQUIRED TOOLKITS
+# ------------------------------------------------------------------------------
+import hashlib      # Helps us make a fingerprint of each page body
+import json         # Helps us store a few of the website's answer headers
+import os           # Helps us work with files and folders on your computer
+import threading    # Helps us give each temporary file its own name
+import time         # Helps us note when a page was fetched and used
+import zlib         # Helps us squeeze the pages so they take less space
+from collections import namedtuple  # Helps us create small, read-only records
+from store import SqliteStore, resolve_path, section_settings
+
+# ------------------------------------------------------------------------------
+# 2. SETTINGS
+# ------------------------------------------------------------------------------
+DEFAULT_CACHE_SETTINGS = {
+    "enabled": False,
+    "directory": "page_cache",
+    "ttl_hours": 24,
+    "max_size_mb": 500,
+}
+
+# How the cache is used on this run
+CACHE_NORMAL = "normal"          # Use fresh saved copies, download the rest
+CACHE_REFRESH = "refresh"        # Always download, and update the saved copies
+CACHE_ONLY = "cache-only"        # Never download; only use saved copies (even old ones)
+
+# The only answer headers worth keeping with a page (the rest change every time)
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+# One saved page as it comes back from the cache
+CachedPage = namedtuple("CachedPage", ["content", "status_code", "headers", "fetched_at", "fresh"])
+
+
+def _kept_headers(headers):
+    """Picks the few answer headers worth saving (see KEPT_HEADERS), whatever their spelling."""
+    kept = {}
+    for name, value in (headers or {}).items():
+        for wanted in KEPT_HEADERS:
+            if name.lower() == wanted.lower():
+                kept[wanted] = value
+    return kept
+
+
+def conditional_headers(cached):
+    """
+    Returns the request headers that ask the website "send the page only if it
+    changed since this saved copy" (If-None-Match / If-Modified-Since), or {}.
+    The website then answers 304 ("not modified") with no page at all.
+    """
+    if cached is None:
+        return {}
+    headers = {}
+    if cached.headers.get("ETag"):
+        headers["If-None-Match"] = cached.headers["ETag"]
+    if cached.headers.get("Last-Modified"):
+        headers["If-Modified-Since"] = cached.headers["Last-Modified"]
+    return headers
+
+
+def cache_mode(args):
+    """Works out the cache mode from the --refresh / --cache-only switches."""
+    if getattr(args, "cache_only", False):
+        return CACHE_ONLY
+    if getattr(args, "refresh", False):
+        return CACHE_REFRESH
+    return CACHE_NORMAL
+
+
+def add_cache_arguments(parser):
+    """Adds the --refresh and --cache-only switches to a script's options."""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--refresh", action="store_true",
+                       help="Download every page again, even if a fresh saved copy exists")
+    group.add_argument("--cache-only", action="store_true",
+                       help="Never contact the website; only use pages saved earlier")
+
+# ------------------------------------------------------------------------------
+# 3. THE CACHE
+# ------------------------------------------------------------------------------
+
+class PageCache(SqliteStore):
+    """
+    Saved, squeezed copies of downloaded pages, looked up by their link (URL).
+    Safe to share between threads; several processes may also open the same
+    folder at the same time.
+    """
+
+    SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY, digest TEXT NOT NULL, status_code INTEGER,
+            headers TEXT, fetched_at REAL NOT NULL, last_used REAL NOT NULL)""",
+        """CREATE TABLE IF NOT EXISTS objects (
+            digest TEXT PRIMARY KEY, size INTEGER NOT NULL)""",
+        """CREATE TABLE IF NOT EXISTS records (
+            key TEXT NOT NULL, tag TEXT NOT NULL, record TEXT NOT NULL, PRIMARY KEY (key, tag))""",
+        "CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)",
+    )
+
+    def __init__(self, directory, ttl_seconds=24 * 3600, max_bytes=500 * 1024 * 1024, mode=CACHE_NORMAL):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.mode = mode
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        super().__init__(os.path.join(directory, "index.sqlite"))
+
+    @classmethod
+    def from_config(cls, config, mode=CACHE_NORMAL, base_dir=None):
+        """
+        Opens the cache described in config.kml, or returns None when it is
+        switched off (unless --cache-only / --refresh asked for it).
+        """
+        settings = section_settings(config, "cache", DEFAULT_CACHE_SETTINGS)
+        if not settings["enabled"] and mode == CACHE_NORMAL:
+            return None
+        return cls(
+            resolve_path(settings["directory"], base_dir),
+            ttl_seconds=float(settings["ttl_hours"]) * 3600,
+            max_bytes=int(float(settings["max_size_mb"]) * 1024 * 1024),
+            mode=mode,
+        )
+
+    def _object_path(self, digest):
+        return os.path.join(self.directory, "objects", digest[:2], digest + ".z")
+
+    # --- Reading ----------------------------------------------------------------
+
+    def get(self, key, allow_stale=False):
+        """
+        Returns the saved CachedPage for 'key' (usually the page link), or None.
+        Pages older than the time to live are only returned with allow_stale=True.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest, status_code, headers, fetched_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            digest, status_code, headers, fetched_at = row
+            fresh = not self.ttl_seconds or time.time() - fetched_at <= self.ttl_seconds
+            if not fresh and not allow_stale:
+                return None
+            try:
+                with open(self._object_path(digest), "rb") as f:
+                    content = zlib.decompress(f.read())
+            except (OSError, zlib.error):
+                # The saved file is gone or damaged: forget about it
+                with self._db:
+                    self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._db.execute("DELETE FROM records WHERE key = ?", (key,))
+                return None
+            with self._db:
+                self._db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        return CachedPage(content, status_code, json.loads(headers or "{}"), fetched_at, fresh)
+
+    def lookup(self, key):
+        """
+        Returns the saved page to use INSTEAD of downloading on this run, or
+        None if we should download. This follows the run's mode:
+        normal -> fresh copies only, refresh -> never, cache-only -> any copy.
+        """
+        if self.mode == CACHE_REFRESH:
+            return None
+        return self.get(key, allow_stale=self.mode == CACHE_ONLY)
+
+    def revalidation_copy(self, key):
+        """
+        Returns the saved copy (fresh or old) whose validators may be sent with
+        the next download of 'key', or None. --refresh always downloads in full.
+        """
+        if self.mode == CACHE_REFRESH:
+            return None
+        return self.get(key, allow_stale=True)
+
+    def get_record(self, key, tag):
+        """Returns the row a scraper saved for 'key' with save_record(), or None."""
+        with self._lock:
+            row = self._db.execute("SELECT record FROM records WHERE key = ? AND tag = ?", (key, tag)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # --- Writing ----------------------------------------------------------------
+
+    def put(self, key, content, status_code=200, headers=None):
+        """Saves a downloaded page (text or bytes) under 'key', then trims the cache if it is too big."""
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._object_path(digest)
+        now = time.time()
+
+        with self._lock:
+            known = self._db.execute("SELECT 1 FROM objects WHERE digest = ?", (digest,)).fetchone()
+            if known is None or not os.path.isfile(path):
+                # Write to a temporary name first, so a crash never leaves half a file behind
+                squeezed = zlib.compress(content, 6)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(temp_path, "wb") as f:
+                    f.write(squeezed)
+                os.replace(temp_path, path)
+                with self._db:
+                    self._db.execute("INSERT OR REPLACE INTO objects (digest, size) VALUES (?, ?)",
+                                     (digest, len(squeezed)))
+            old = self._db.execute("SELECT digest FROM entries WHERE key = ?", (key,)).fetchone()
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries (key, digest, status_code, headers, fetched_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, digest, status_code, json.dumps(_kept_headers(headers)), now, now),
+                )
+            if old and old[0] != digest:
+                # The page changed, so any row read from the old copy is out of date
+                with self._db:
+                    self._db.execute("DELETE FROM records WHERE key = ?", (key,))
+                self._drop_object_if_unused(old[0])
+            self._evict()
+
+    def touch(self, key, headers=None):
+        """
+        Marks the saved copy of 'key' as fresh again, after the website said it
+        has not changed (304). New validators sent with that answer are kept.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT headers FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return
+            kept = json.loads(row[0] or "{}")
+            kept.update(_kept_headers(headers))
+            now = time.time()
+            with self._db:
+                self._db.execute("UPDATE entries SET headers = ?, fetched_at = ?, last_used = ? WHERE key = ?",
+                                 (json.dumps(kept), now, now, key))
+
+    def save_record(self, key, tag, record):
+        """
+        Keeps the row a scraper read from the saved copy of 'key'. 'tag' names
+        the kind of row (for example the scraper and its columns), so scrapers
+        with different columns never mix up each other's rows.
+        """
+        with self._lock:
+            with self._db:
+                self._db.execute("INSERT OR REPLACE INTO records (key, tag, record) VALUES (?, ?, ?)",
+                                 (key, tag, json.dumps(record)))
+
+    def _drop_object_if_unused(self, digest):
+        still_used = self._db.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+        if still_used:
+            return
+        with self._db:
+            self._db.execute("DELETE FROM objects WHERE digest = ?", (digest,))
+        try:
+            os.remove(self._object_path(digest))
+        except OSError:
+            pass
+
+    def total_bytes(self):
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    def _evict(self):
+        """Removes the least recently used pages until the cache fits in its size limit."""
+        if not self.max_bytes:
+            return
+        while self.total_bytes() > self.max_bytes:
+            oldest = self._db.execute(
+                "SELECT key, digest FROM entries ORDER BY last_used ASC LIMIT 1"
+            ).fetchone()
+            if oldest is None:
+                break
+            with self._db:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (oldest[0],))
+                self._db.execute("DELETE FROM records WHERE key = ?", (oldest[0],))
+            self._drop_object_if_unused(oldest[1])
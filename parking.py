@@ -0,0 +1,116 @@
+# ==============================================================================
+# PENERAJU ROBOT-CHECK PARKING LOT (IDs that need a person)
+# ==============================================================================
+# When the website showed a robot check (CAPTCHA), 'scraper_71.py' used to stop
+# EVERYTHING and wait for someone to press ENTER. During an overnight run that
+# meant the very first robot check wasted the rest of the night.
+#
+# Now an ID that hits a robot check is "parked" instead: it is written down
+# in a small file and the run simply carries on with the next IDs (the speed
+# limit already slows down after a robot check, so the website gets a rest).
+# When someone is available, they clear the parked IDs:
+#   - at the end of the run, the script offers to visit them again, or
+#   - later, with:   python scraper_71.py --clear-captchas
+# Either way the script asks for the robot check to be solved, then visits only
+# the parked IDs. Every ID that works this time is taken off the list.
+#
+# The settings live in the "captcha" part of config.kml:
+#     "on_captcha"   : "park" (write the ID down and carry on) or "ask" (stop and
+#                      wait for ENTER straight away, like before)
+#     "parking_file" : the file that remembers the parked IDs
+# ==============================================================================
+
+# ------------------------------------------------------------------------------
+# 1. IMPORTING REQUIRED TOOLKITS
+# ------------------------------------------------------------------------------
+import json         # Helps us save the parked IDs in a simple text file
+import os           # Helps us work with files and folders on your computer
+import threading    # Helps us share one parking lot safely between workers
+import time         # Helps us note when an ID was parked
+from store import resolve_path, section_settings
+
+# ------------------------------------------------------------------------------
+# 2. SETTINGS
+# ------------------------------------------------------------------------------
+DEFAULT_CAPTCHA_SETTINGS = {
+    "on_captcha": "park",
+    "parking_file": "captcha_queue.json",
+}
+
+CAPTCHA_MODES = ("park", "ask")
+
+
+def captcha_settings(config):
+    """
+    Returns the "captcha" settings from config.kml, with defaults for anything
+    missing. Raises ValueError for an unknown "on_captcha" choice.
+    """
+    settings = section_settings(config, "captcha", DEFAULT_CAPTCHA_SETTINGS)
+    if settings["on_captcha"] not in CAPTCHA_MODES:
+        raise ValueError(f"Unknown on_captcha '{settings['on_captcha']}' (choose from: {', '.join(CAPTCHA_MODES)})")
+    return settings
+
+
+def add_captcha_arguments(parser):
+    """Adds the --clear-captchas switch to a script's argument parser."""
+    parser.add_argument("--clear-captchas", action="store_true",
+                        help="Only visit the IDs that were parked after a robot check")
+
+# ------------------------------------------------------------------------------
+# 3. THE PARKING LOT
+# ------------------------------------------------------------------------------
+
+class ParkingLot:
+    """
+    The IDs waiting for a person to solve a robot check, kept in a JSON file
+    so they survive the end of the run (or a crash). Every change is saved
+    straight away, by writing a new file and then swapping it in, so the file
+    is never left half-written.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._parked = self._read()
+
+    @classmethod
+    def from_config(cls, config, base_dir=None):
+        return cls(resolve_path(captcha_settings(config)["parking_file"], base_dir))
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        temp_file = self.path + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(self._parked, f, indent=2)
+        os.replace(temp_file, self.path)
+
+    def park(self, course_id, url):
+        """Writes an ID down as waiting for a person (again, if it was already parked)."""
+        with self._lock:
+            entry = self._parked.get(str(course_id), {"url": url, "times": 0})
+            entry["times"] += 1
+            entry["parked_at"] = time.time()
+            self._parked[str(course_id)] = entry
+            self._save()
+
+    def unpark(self, course_id):
+        """Takes an ID off the list (when it worked after all). Returns True if it was parked."""
+        with self._lock:
+            if self._parked.pop(str(course_id), None) is None:
+                return False
+            self._save()
+            return True
+
+    def ids(self):
+        """Returns the parked IDs, smallest first."""
+        with self._lock:
+            return sorted(int(course_id) for course_id in self._parked)
+
+    def __len__(self):
+        return len(self._parked)
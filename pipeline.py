@@ -0,0 +1,171 @@
+# ==============================================================================
+# PENERAJU PAGE PIPELINE (download, read and save at the same time)
+# ==============================================================================
+# 'scraper.py' used to download a page, read it (parse), print it and save the
+# row, all in one go, before even starting on the next page. While it was
+# reading, the network sat idle; while it was downloading, the computer did.
+#
+# This file splits the work into three "stages" that run at the same time,
+# like workers on a production line:
+#
+#   1. DOWNLOAD : a few threads download pages (waiting on the website costs
+#                 no computer power, so several can wait at once)
+#   2. READ     : a few separate processes pick the fields out of each page,
+#                 so every core of the computer can help
+#   3. SAVE     : ONE writer (the main script) saves the rows, so the output
+#                 file is never written by two stages at once
+#
+# The stages are connected by small queues. When a later stage falls behind,
+# its queue fills up and the stage before it simply waits ("back-pressure"),
+# so memory use stays flat even for very large ID ranges.
+#
+# The settings live in the "pipeline" part of config.kml, and are used when
+# the "engine" in the "http" part is "pipeline":
+#     "fetch_workers" : how many pages may be downloaded at the same time
+#     "parse_workers" : how many processes read pages (null = one per core,
+#                       0 = read them in a thread of this script instead)
+#     "queue_size"    : how many pages may wait between two stages
+# ==============================================================================
+
+# ------------------------------------------------------------------------------
+# 1. IMPORTING REQUIRED TOOLKITS
+# ------------------------------------------------------------------------------
+import os           # Helps us count the cores of this computer
+import queue        # Helps us hand pages from one stage to the next safely
+import threading    # Helps us run the download and read stages at the same time
+from concurrent.futures import Future, ProcessPoolExecutor  # Helps us read pages in other processes
+from store import section_settings
+
+# ------------------------------------------------------------------------------
+# 2. SETTINGS
+# ------------------------------------------------------------------------------
+DEFAULT_PIPELINE_SETTINGS = {
+    "fetch_workers": 4,
+    "parse_workers": None,
+    "queue_size": 16,
+}
+
+
+def _run_here(function, value):
+    """Runs function(value) straight away and wraps the answer like a process pool would."""
+    future = Future()
+    try:
+        future.set_result(function(value))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+# ------------------------------------------------------------------------------
+# 3. THE PIPELINE
+# ------------------------------------------------------------------------------
+
+class Pipeline:
+    """
+    Runs every item through fetch(item) in 'fetch_workers' threads, then
+    parse(fetched) in 'parse_workers' processes, then write(...) here, in the
+    main script. Between two stages at most 'queue_size' items wait.
+    """
+
+    def __init__(self, fetch_workers=4, parse_workers=None, queue_size=16):
+        self.fetch_workers = max(1, int(fetch_workers))
+        self.parse_workers = (os.cpu_count() or 1) if parse_workers is None else max(0, int(parse_workers))
+        self.queue_size = max(1, int(queue_size))
+
+    @classmethod
+    def from_config(cls, config):
+        settings = section_settings(config, "pipeline", DEFAULT_PIPELINE_SETTINGS)
+        return cls(
+            fetch_workers=settings["fetch_workers"],
+            parse_workers=settings["parse_workers"],
+            queue_size=settings["queue_size"],
+        )
+
+    def run(self, items, fetch, parse, write, skip_parse=None):
+        """
+        Sends every item down the line. write(item, fetched, parsed, error) is
+        called for each item as it comes out at the end (so NOT necessarily in
+        the original order). 'error' is the problem from the download or read
+        stage, if there was one; parse() is skipped when the download failed,
+        or when skip_parse(fetched) says the page does not need reading.
+        'parse' must be a normal top-level function, so other processes can run it.
+        """
+        items = list(items)
+        jobs = queue.Queue()
+        for item in items:
+            jobs.put(item)
+        # The small queues between the stages: a stage waits if the next one falls behind
+        fetched_queue = queue.Queue(maxsize=self.queue_size)
+        parsed_queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+
+        def hand_on(to_queue, entry):
+            """Puts an entry on the next queue, waiting while it is full (unless we are stopping)."""
+            while not stop.is_set():
+                try:
+                    to_queue.put(entry, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def fetch_worker():
+            while not stop.is_set():
+                try:
+                    item = jobs.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    fetched, error = fetch(item), None
+                except Exception as e:
+                    fetched, error = None, e
+                if not hand_on(fetched_queue, (item, fetched, error)):
+                    return
+
+        def parse_dispatcher(executor):
+            # Hands each downloaded page to a free reader. The answer is collected
+            # by the writer, so reading several pages can happen at the same time
+            for _ in range(len(items)):
+                while True:
+                    try:
+                        item, fetched, error = fetched_queue.get(timeout=0.5)
+                        break
+                    except queue.Empty:
+                        if stop.is_set():
+                            return
+                if error is not None or (skip_parse is not None and skip_parse(fetched)):
+                    future = None
+                elif executor is not None:
+                    future = executor.submit(parse, fetched)
+                else:
+                    future = _run_here(parse, fetched)
+                if not hand_on(parsed_queue, (item, fetched, error, future)):
+                    return
+
+        executor = ProcessPoolExecutor(max_workers=self.parse_workers) if self.parse_workers else None
+        threads = [threading.Thread(target=fetch_worker, daemon=True)
+                   for _ in range(min(self.fetch_workers, len(items)))]
+        threads.append(threading.Thread(target=parse_dispatcher, args=(executor,), daemon=True))
+        for thread in threads:
+            thread.start()
+        try:
+            for _ in range(len(items)):
+                while True:
+                    try:
+                        # Wake up now and then, so Ctrl+C is noticed straight away
+                        item, fetched, error, future = parsed_queue.get(timeout=0.5)
+                        break
+                    except queue.Empty:
+                        if not threads[-1].is_alive() and parsed_queue.empty():
+                            return
+                parsed = None
+                if future is not None:
+                    try:
+                        parsed = future.result()
+                    except Exception as e:
+                        error = e
+                write(item, fetched, parsed, error)
+        finally:
+            # Tell the stages to stop (e.g. after Ctrl+C) and drop pages not read yet
+            stop.set()
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,194 @@
+# ==============================================================================
+# PENERAJU ADAPTIVE SPEED LIMIT (RATE LIMITER)
+# ==============================================================================
+# The scrapers used to wait a fixed time between pages (30 seconds in
+# scraper.py, 5 to 10 seconds in the Selenium scrapers), no matter how the
+# website was coping. That is always the slowest, worst-case speed.
+#
+# This file gives all scrapers one "speed limit" that listens to the website:
+#   - it starts at a configured speed (pages per second),
+#   - it slows down straight away when the website says "too many requests"
+#     (HTTP 429 or 503), asks us to wait ("Retry-After"), shows a robot check
+#     (CAPTCHA), or suddenly gets much slower to answer,
+#   - and it speeds up again, a little at a time, while everything is healthy.
+# So we go as fast as the website is happy with, and stay polite automatically.
+#
+# The settings live in the "rate_limit" part of config.kml:
+#     "start_rate"      : pages per second to begin with
+#     "min_rate"        : never go slower than this
+#     "max_rate"        : never go faster than this
+#     "burst"           : how many pages may be sent back-to-back after a quiet spell
+#     "backoff_factor"  : how much to slow down on trouble (0.5 = half the speed)
+#     "ramp_step"       : how much speed to add after a healthy stretch
+#     "ramp_after"      : how many healthy pages make a "healthy stretch"
+#     "latency_factor"  : an answer this many times slower than usual counts as trouble
+#     "jitter"          : extra random wait (0.2 = up to 20% more) so we look less robotic
+# ==============================================================================
+
+# ------------------------------------------------------------------------------
+# 1. IMPORTING REQUIRED TOOLKITS
+# ------------------------------------------------------------------------------
+import asyncio      # Helps us wait without blocking other pages that are in flight
+import random       # Helps us choose random numbers (for the jitter)
+import threading    # Helps us share one speed limit safely between workers
+import time         # Helps us measure time and pause
+from email.utils import parsedate_to_datetime  # Helps us read dates sent by the website
+from store import section_settings
+
+# ------------------------------------------------------------------------------
+# 2. SETTINGS
+# ------------------------------------------------------------------------------
+DEFAULT_RATE_LIMIT = {
+    "start_rate": 0.15,
+    "min_rate": 0.02,
+    "max_rate": 1.0,
+    "burst": 1,
+    "backoff_factor": 0.5,
+    "ramp_step": 0.02,
+    "ramp_after": 10,
+    "latency_factor": 3.0,
+    "jitter": 0.2,
+}
+
+# Answers from the website that mean "slow down"
+SLOW_DOWN_STATUS_CODES = (429, 503)
+
+
+def parse_retry_after(value):
+    """
+    Reads a "Retry-After" answer from the website, which is either a number of
+    seconds or a date, and returns the number of seconds to wait (or None).
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+# ------------------------------------------------------------------------------
+# 3. THE SPEED LIMIT
+# ------------------------------------------------------------------------------
+
+class AdaptiveRateLimiter:
+    """
+    A "token bucket": tokens drip in at 'rate' per second (up to 'burst' of them)
+    and every page request uses one. If the bucket is empty, the request waits.
+    The speed is changed by record(), which is told how each page went.
+    It can be shared by several threads, or by many async requests.
+    """
+
+    def __init__(self, start_rate, min_rate=0.02, max_rate=1.0, burst=1, backoff_factor=0.5,
+                 ramp_step=0.02, ramp_after=10, latency_factor=3.0, jitter=0.0):
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, min_rate)
+        self.rate = min(max(start_rate, self.min_rate), self.max_rate)
+        self.burst = max(1, burst)
+        self.backoff_factor = backoff_factor
+        self.ramp_step = ramp_step
+        self.ramp_after = max(1, ramp_after)
+        self.latency_factor = latency_factor
+        self.jitter = jitter
+
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._healthy_streak = 0
+        self._usual_latency = None   # Slowly-moving average of healthy answer times
+        self._latency_samples = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, start_rate=None, rate_cap=None):
+        """
+        Builds the speed limit from the "rate_limit" part of config.kml.
+        'start_rate' (if given, e.g. typed on the command line) replaces the
+        starting speed from config.kml. 'rate_cap' (if given) is an extra
+        ceiling: the HTTP scraper passes its "requests_per_second" here, so the
+        lower of the two settings always wins and neither one speeds the other up.
+        """
+        settings = section_settings(config, "rate_limit", DEFAULT_RATE_LIMIT)
+        if start_rate is not None:
+            settings["start_rate"] = start_rate
+            settings["max_rate"] = max(settings["max_rate"], start_rate)
+        if rate_cap is not None:
+            for name in ("start_rate", "min_rate", "max_rate"):
+                settings[name] = min(settings[name], rate_cap)
+        return cls(**settings)
+
+    # --- Waiting for our turn -------------------------------------------------
+
+    def _reserve(self):
+        """Takes one token and returns how many seconds the caller must wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            wait = max(wait, self._paused_until - now)
+        if wait > 0 and self.jitter:
+            wait += random.uniform(0, self.jitter * wait)
+        return wait
+
+    def wait(self):
+        """Pauses (in normal code) until the next page may be requested."""
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def wait_async(self):
+        """Same as wait(), for async code: other requests keep going while we wait."""
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    # --- Listening to the website ---------------------------------------------
+
+    def record(self, status_code=None, latency=None, captcha=False, retry_after=None):
+        """
+        Tells the speed limit how one page went, so it can slow down or speed up.
+        'latency' is how many seconds the answer took; 'retry_after' is the
+        website's "Retry-After" value (text or seconds), if it sent one.
+        """
+        if isinstance(retry_after, str):
+            retry_after = parse_retry_after(retry_after)
+
+        with self._lock:
+            if status_code in SLOW_DOWN_STATUS_CODES or captcha or retry_after:
+                self._slow_down(self.backoff_factor)
+                if retry_after:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                return "slower"
+
+            if latency is not None and self._is_latency_spike(latency):
+                # Much slower than usual: a gentler slow-down than a real "stop"
+                self._slow_down((1 + self.backoff_factor) / 2)
+                return "slower"
+
+            self._healthy_streak += 1
+            if self._healthy_streak >= self.ramp_after:
+                self._healthy_streak = 0
+                self.rate = min(self.max_rate, self.rate + self.ramp_step)
+                return "faster"
+            return "same"
+
+    def _slow_down(self, factor):
+        self.rate = max(self.min_rate, self.rate * factor)
+        self._healthy_streak = 0
+        # Don't let tokens saved up at the old speed be spent in a rush
+        self._tokens = min(self._tokens, 0.0)
+
+    def _is_latency_spike(self, latency):
+        usual = self._usual_latency
+        self._latency_samples += 1
+        if usual is not None and self._latency_samples > 5 and latency > usual * self.latency_factor:
+            return True
+        # Only healthy answers teach us what "usual" is
+        self._usual_latency = latency if usual is None else usual * 0.9 + latency * 0.1
+        return False
@@ -0,0 +1,187 @@
+# ==============================================================================
+# PENERAJU OFFLINE RE-EXTRACTION SCRIPT
+# ==============================================================================
+# This script does NOT visit the website. It reads course pages that were saved
+# earlier (a folder, or a .zip file, of pages named after their course ID, for
+# example '100.html', 'course_101.html' or '102.html.gz') and runs them through
+# the same reading steps as scraper_71.py, using the CURRENT 'config.kml'.
+#
+# So when you add a new field to config.kml, you can fill it in for every page
+# you already have in a few minutes, instead of visiting the website again for
+# days. All the processor cores of your computer are used at the same time.
+#
+# Example:
+#     python reextract.py saved_pages --output reextracted.csv
+# ==============================================================================
+
+# ------------------------------------------------------------------------------
+# 1. IMPORTING REQUIRED TOOLKITS
+# ------------------------------------------------------------------------------
+import argparse     # Helps us read the options typed after the script name
+import csv          # Helps us create and save an Excel-friendly output file
+import gzip         # Helps us open pages that were saved squeezed (.gz)
+import os           # Helps us work with files and folders on your computer
+import re           # Helps us find the course ID number inside a file name
+import time         # Helps us measure how long the whole job took
+import zipfile      # Helps us open pages stored inside a .zip file
+from collections import Counter  # Helps us count things (like how many pages were empty)
+from concurrent.futures import ProcessPoolExecutor  # Helps us use all processor cores at once
+from extraction import load_config, compile_plan, classify_page, parse_html, PARSER_BACKENDS, PAGE_EMPTY
+
+# ------------------------------------------------------------------------------
+# 2. FINDING THE SAVED PAGES
+# ------------------------------------------------------------------------------
+PAGE_SUFFIXES = (".html", ".htm", ".html.gz", ".htm.gz")
+ID_IN_NAME = re.compile(r"(\d+)")
+
+
+def course_id_from_name(file_name):
+    """Returns the course ID number found in a saved page's file name, or None."""
+    base = os.path.basename(file_name)
+    if not base.lower().endswith(PAGE_SUFFIXES):
+        return None
+    match = ID_IN_NAME.search(base)
+    return int(match.group(1)) if match else None
+
+
+def find_saved_pages(source):
+    """
+    Lists every saved page in a folder (looking inside sub-folders too) or in a
+    .zip file, as (course ID, source, name) jobs. Files without an ID number in
+    their name (like 'page_src.html') are skipped. If the same ID is saved more
+    than once, the last one found is used.
+    """
+    pages = {}
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for name in archive.namelist():
+                course_id = course_id_from_name(name)
+                if course_id is not None:
+                    pages[course_id] = (course_id, source, name)
+    else:
+        for folder, _, files in os.walk(source):
+            for name in files:
+                course_id = course_id_from_name(name)
+                if course_id is not None:
+                    pages[course_id] = (course_id, None, os.path.join(folder, name))
+    return [pages[course_id] for course_id in sorted(pages)]
+
+
+def read_saved_page(archive_path, name):
+    """Reads one saved page as raw bytes (from the folder, or from inside the .zip file)."""
+    if archive_path:
+        with zipfile.ZipFile(archive_path) as archive:
+            content = archive.read(name)
+    else:
+        with open(name, "rb") as f:
+            content = f.read()
+    if name.lower().endswith(".gz"):
+        content = gzip.decompress(content)
+    return content
+
+# ------------------------------------------------------------------------------
+# 3. THE WORKERS (each one runs on its own processor core)
+# ------------------------------------------------------------------------------
+# Every worker receives the ready-made checklist (extraction plan) only ONCE,
+# when it starts, and keeps it for all the pages it is given.
+_worker_plan = None
+
+
+def _start_worker(plan):
+    global _worker_plan
+    _worker_plan = plan
+
+
+def extract_saved_page(job):
+    """
+    Reads one saved page and returns (course ID, page kind, data). 'data' is
+    the bucket of fields for real course pages, and None for every other kind.
+    """
+    course_id, archive_path, name = job
+    try:
+        html = read_saved_page(archive_path, name)
+    except Exception as e:
+        print(f"[-] ID {course_id}: Could not read {name} - {e}")
+        return course_id, "READ-ERROR", None
+
+    page_kind = classify_page(html, _worker_plan)
+    result = parse_html(html, course_id, _worker_plan)
+    if isinstance(result, dict):
+        return course_id, page_kind, result
+    if result is None:
+        # Looked like a course page at first sight, but had no title inside
+        page_kind = PAGE_EMPTY
+    return course_id, page_kind, None
+
+
+def pick_chunksize(job_count, workers):
+    """
+    Hands out pages to the workers in batches, so they are not kept waiting
+    for one tiny page at a time, while still sharing the work out evenly
+    (about four batches per worker).
+    """
+    return max(1, min(256, job_count // (workers * 4)))
+
+# ------------------------------------------------------------------------------
+# 4. THE MAIN SCRIPT PROCESS
+# ------------------------------------------------------------------------------
+def parse_args():
+    parser = argparse.ArgumentParser(description="Re-read saved course pages with the current config.kml")
+    parser.add_argument("source", help="Folder (or .zip file) of saved pages named after their course ID")
+    parser.add_argument("--output", default="reextracted.csv", help="CSV file to write (default: reextracted.csv)")
+    parser.add_argument("--config", help="Settings file to use (default: config.kml next to this script)")
+    parser.add_argument("--parser", choices=sorted(PARSER_BACKENDS),
+                        help="Which page reader to use (overrides 'parser_backend' in config.kml)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="How many processor cores to use (default: all of them)")
+    parser.add_argument("--chunksize", type=int, help="How many pages to hand a worker at once (default: automatic)")
+    return parser.parse_args()
+
+
+def main():
+    print("--- Peneraju Offline Re-extraction ---")
+    args = parse_args()
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    config = load_config(args.config or os.path.join(script_dir, "config.kml"))
+    if not config:
+        print("[-] Exiting because config.kml is missing or invalid.")
+        return
+    try:
+        plan = compile_plan(config, backend=args.parser)
+    except ValueError as e:
+        print(f"[-] {e}")
+        return
+
+    jobs = find_saved_pages(args.source)
+    if not jobs:
+        print(f"[-] No saved pages with a course ID in their name were found in {args.source}")
+        return
+
+    workers = max(1, args.workers)
+    chunksize = args.chunksize or pick_chunksize(len(jobs), workers)
+    print(f"[+] {len(jobs)} saved pages, {workers} workers, {chunksize} pages per batch, reader '{plan.backend}'")
+
+    started = time.perf_counter()
+    records = []
+    page_counts = Counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_start_worker, initargs=(plan,)) as executor:
+        # Results come back in the same order as the jobs (sorted by course ID)
+        for course_id, page_kind, data in executor.map(extract_saved_page, jobs, chunksize=chunksize):
+            page_counts[page_kind] += 1
+            if data:
+                records.append(data)
+
+    with open(args.output, "w", encoding="utf-8", newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(plan.fieldnames))
+        writer.writeheader()
+        writer.writerows(records)
+
+    elapsed = time.perf_counter() - started
+    print("[+] Pages seen: " + ", ".join(f"{kind} = {count}" for kind, count in sorted(page_counts.items())))
+    print(f"[+] {len(records)} courses written to {args.output} in {elapsed:.1f} s "
+          f"({len(jobs) / elapsed if elapsed else 0:.0f} pages/sec)")
+
+
+if __name__ == "__main__":
+    main()
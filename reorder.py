@@ -0,0 +1,118 @@
+# ==============================================================================
+# PENERAJU ORDERED OUTPUT (REORDER BUFFER)
+# ==============================================================================
+# When several pages are downloaded (or several Chrome windows are used) at
+# the same time, pages finish in a slightly random order: ID 12 may be done
+# before ID 11. Anything that reads 'output.csv' afterwards usually expects
+# the rows in ID order, like the old one-page-at-a-time scrapers wrote them.
+#
+# This file holds a "reorder buffer" that sits in front of the CSV writer:
+#   - a row that arrives early waits in the buffer until every ID before it
+#     is done, then it is written,
+#   - IDs without a row (empty pages, errors, skipped pages) are gaps: they
+#     are marked as done, so the rows after them are not held up,
+#   - at most "reorder_buffer" rows wait. If one slow ID would hold up more
+#     than that, the rows after it are written first and its row (if it
+#     still comes) is written as soon as it arrives.
+#
+# The settings live in the "output" part of config.kml:
+#     "ordered"        : true = rows in ID order, false = rows as soon as they
+#                        are ready (fastest, but not in ID order)
+#     "reorder_buffer" : the most rows that may wait for a slower ID
+#
+# The scrapers also accept --unordered to switch the ordering off for one run.
+# ==============================================================================
+
+# ------------------------------------------------------------------------------
+# 1. SETTINGS
+# ------------------------------------------------------------------------------
+from store import section_settings
+
+DEFAULT_OUTPUT_SETTINGS = {
+    "ordered": True,
+    "reorder_buffer": 1000,
+}
+
+
+def add_output_arguments(parser):
+    """Adds the --unordered switch to a script's argument parser."""
+    parser.add_argument("--unordered", action="store_true",
+                        help="Write rows as soon as they are ready instead of in ID order")
+
+# ------------------------------------------------------------------------------
+# 2. THE REORDER BUFFER
+# ------------------------------------------------------------------------------
+
+class ReorderBuffer:
+    """
+    Hands the rows for 'ids' to write_row() in the order of 'ids', whatever
+    order they arrive in. Every ID must be reported once with add(), with
+    None as the row when there is nothing to write. Not thread-safe: it is
+    meant to be used by the one writer in the main script.
+    """
+
+    def __init__(self, ids, write_row, ordered=True, max_waiting=1000):
+        # A range can tell where an ID sits in it without a big lookup table;
+        # any other list of IDs (for example a crawl plan) gets one
+        self.ids = ids if isinstance(ids, range) else list(ids)
+        self._positions = None if isinstance(ids, range) else {
+            course_id: position for position, course_id in reversed(list(enumerate(self.ids)))}
+        self.write_row = write_row
+        self.ordered = ordered
+        self.max_waiting = max(1, int(max_waiting))
+        self.late_rows = 0
+        self._next = 0          # Position (in 'ids') of the next ID to write
+        self._waiting = {}      # Position -> row (None for a gap)
+
+    @classmethod
+    def from_config(cls, config, ids, write_row, args=None):
+        settings = section_settings(config, "output", DEFAULT_OUTPUT_SETTINGS)
+        ordered = settings["ordered"] and not getattr(args, "unordered", False)
+        return cls(ids, write_row, ordered=ordered, max_waiting=settings["reorder_buffer"])
+
+    def _position(self, course_id):
+        if self._positions is not None:
+            return self._positions.get(course_id)
+        try:
+            return self.ids.index(course_id)
+        except ValueError:
+            return None
+
+    def add(self, course_id, row):
+        """Reports the row for one ID (None if there is nothing to write)."""
+        position = self._position(course_id) if self.ordered else None
+        if position is None or position < self._next:
+            # Unordered, or an ID we already stopped waiting for: write it straight away
+            if position is not None:
+                self.late_rows += 1
+            if row:
+                self.write_row(row)
+            return
+
+        self._waiting[position] = row
+        self._write_ready_rows()
+        while len(self._waiting) > self.max_waiting:
+            # Too many rows held up by one slow ID: stop waiting for it
+            print(f"[!] ID {self.ids[self._next]} is taking long; writing the rows after it first")
+            while self._next not in self._waiting:
+                self._next += 1
+            self._write_ready_rows()
+
+    def _write_ready_rows(self):
+        """Writes every waiting row whose turn has come."""
+        while self._next in self._waiting:
+            row = self._waiting.pop(self._next)
+            self._next += 1
+            if row:
+                self.write_row(row)
+
+    def close(self):
+        """
+        Writes the rows that are still waiting (in order), for example after
+        the run was stopped before every ID was done.
+        """
+        for position in sorted(self._waiting):
+            row = self._waiting[position]
+            if row:
+                self.write_row(row)
+        self._waiting.clear()
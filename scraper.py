@@ -1,12 +1,39 @@
 # line 169 set delay for 5 seconds
+# ------------------------------------------------------------------------------
+# 1. IMPORTING REQUIRED TOOLKITS
+# ------------------------------------------------------------------------------
 import requests
 from bs4 import BeautifulSoup
+from extraction import LabelIndex, SoupPage, compile_page_rules, classify_page, load_config, PAGE_VALID, PAGE_CAPTCHA, PAGE_EMPTY, PAGE_HTTP_ERROR
+from fetcher import AsyncFetchEngine, FetchResult, DEFAULT_HTTP_SETTINGS
+from pipeline import Pipeline
+from reorder import ReorderBuffer, add_output_arguments
+from checkpoint import Checkpoint, add_checkpoint_arguments, plan_run, STATUS_DONE, STATUS_EMPTY, STATUS_CAPTCHA, STATUS_ERROR
+from empty_ids import EmptyIdCache, add_empty_id_arguments, skip_known_empty
+from discovery import add_plan_arguments, load_plan_ids
+from changes import ChangeTracker, add_change_arguments, report_changes, CHANGE_SAME
+from rate_limiter import AdaptiveRateLimiter
+from store import section_settings
+from page_cache import PageCache, add_cache_arguments, cache_mode, conditional_headers, CACHE_ONLY
+import argparse
 import sys
 import csv
 import os
+import threading
+from functools import partial
 import time
 import cloudscraper
 
+FIELDNAMES = ['ID', 'Course Name', 'Method', 'Duration', 'ALTI Name', 'Issuer', 'Phone', 'Email', 'Web']
+# Rows kept in the page cache (and the fingerprints of the courses seen before)
+# are labelled with our columns, so a change of columns (or the rows of another
+# scraper) is never mistaken for ours
+RECORD_TAG = "scraper.py:" + ",".join(FIELDNAMES)
+
+# ------------------------------------------------------------------------------
+# 2. DOWNLOADING AND READING ONE COURSE PAGE
+# ------------------------------------------------------------------------------
+
 def get_text_or_none(element):
 # ...
     """Helper to extract stripped text if element exists."""
@@ -14,15 +41,119 @@ def get_text_or_none(element):
         return element.get_text(strip=True)
     return "N/A"
 
-def scrape_course(course_id, session, base_headers):
-    url = f"https://peneraju.org/course-details?id={course_id}"
+def course_url(course_id):
+    return f"https://peneraju.org/course-details?id={course_id}"
+
+def save_to_cache(cache, url, content, status_code, rules, headers=None):
+    """Keeps a copy of real course pages and empty pages (never captcha or error pages)."""
+    if cache and classify_page(content, rules, status_code) in (PAGE_VALID, PAGE_EMPTY):
+        cache.put(url, content, status_code, headers)
+
+def parse_and_remember(course_id, url, content, status_code, rules, cache=None):
+    """Parses a page and keeps the row in the page cache, so an unchanged page is never parsed twice."""
+    info = parse_course(course_id, content, rules, status_code)
+    if cache and info:
+        cache.save_record(url, RECORD_TAG, info)
+    return info
+
+def read_saved_copy(course_id, url, cached, cache, rules):
+    """Returns the row for a saved copy of a page: the row kept last time, or else a fresh parse."""
+    record = cache.get_record(url, RECORD_TAG)
+    if record is not None:
+        print(f"[+] ID {course_id}: Found '{record.get('Course Name', 'N/A')}' (unchanged)")
+        return record
+    return parse_and_remember(course_id, url, cached.content, cached.status_code, rules, cache)
+
+def handle_not_modified(course_id, url, response_headers, cache, rules):
+    """The website answered 304 ("not modified"): the saved copy is still right, so re-use it."""
+    cached = cache.get(url, allow_stale=True) if cache else None
+    if cached is None:
+        print(f"[-] ID {course_id}: HTTP 304 but there is no saved copy")
+        return None
+    cache.touch(url, response_headers)
+    return read_saved_copy(course_id, url, cached, cache, rules)
+
+def fetch_course(course_id, session, base_headers, rules, limiter=None, cache=None, timeout=10):
+    """
+    Downloads one course page and returns a FetchResult (without reading the
+    page). 'timeout' is the "timeout" of the "http" part of config.kml.
+    """
+    url = course_url(course_id)
+    # If we have an older saved copy, only ask for the page if it has changed since
+    saved = cache.revalidation_copy(url) if cache else None
+    request_headers = {**base_headers, **conditional_headers(saved)}
+    started = time.monotonic()
     try:
-        response = session.get(url, headers=base_headers, timeout=10)
-        if response.status_code != 200:
-            print(f"[-] ID {course_id}: HTTP {response.status_code}")
+        response = session.get(url, headers=request_headers, timeout=timeout)
+    except Exception as e:
+        elapsed = time.monotonic() - started
+        if limiter:
+            limiter.record(status_code=503, latency=elapsed)
+        return FetchResult(course_id, url, None, b"", {}, e, elapsed)
+    elapsed = time.monotonic() - started
+    if limiter:
+        # Tell the speed limit how the website coped, so it can slow down or speed up
+        limiter.record(
+            status_code=response.status_code,
+            latency=elapsed,
+            captcha=classify_page(response.content, rules, response.status_code) == PAGE_CAPTCHA,
+            retry_after=response.headers.get("Retry-After"),
+        )
+    return FetchResult(course_id, url, response.status_code, response.content, response.headers, None, elapsed)
+
+def read_fetched(result, rules, cache=None):
+    """Turns a downloaded page (a FetchResult) into a row of data, or None."""
+    if result.error is not None:
+        print(f"[-] ID {result.course_id}: Error - {result.error}")
+        return None
+    if result.status_code == 304:
+        return handle_not_modified(result.course_id, result.url, result.headers, cache, rules)
+    save_to_cache(cache, result.url, result.content, result.status_code, rules, result.headers)
+    return parse_and_remember(result.course_id, result.url, result.content, result.status_code, rules, cache)
+
+def page_status(result, info, rules, cache=None):
+    """The checkpoint note for a downloaded page: done, empty, captcha or error."""
+    if info:
+        return STATUS_DONE
+    if result.error is not None:
+        return STATUS_ERROR
+    if result.status_code == 304:
+        # Our saved copy is still right; it just has no course on it (unless we had none)
+        return STATUS_EMPTY if cache and cache.get(result.url, allow_stale=True) else STATUS_ERROR
+    page_kind = classify_page(result.content, rules, result.status_code)
+    if page_kind == PAGE_CAPTCHA:
+        return STATUS_CAPTCHA
+    if page_kind == PAGE_EMPTY:
+        return STATUS_EMPTY
+    # An error answer, or a course page that could not be read
+    return STATUS_ERROR
+
+def parse_fetched(result, rules):
+    """
+    The "read" stage of the pipeline: runs in a separate process, so it only
+    reads the page (the page cache is looked after by the other stages).
+    """
+    if result.error is not None or result.status_code == 304:
+        return None
+    return parse_course(result.course_id, result.content, rules, result.status_code)
+
+def parse_course(course_id, content, rules, status_code=200):
+    """
+    Turns one downloaded course page into a row of data (or None if there is no
+    course). 'rules' are the page rules for the quick page check (see
+    extraction.compile_page_rules).
+    """
+    try:
+        page_kind = classify_page(content, rules, status_code)
+        if page_kind == PAGE_HTTP_ERROR:
+            print(f"[-] ID {course_id}: HTTP {status_code}")
+            return None
+        if page_kind != PAGE_VALID:
+            # Captcha and empty pages are recognised from the raw bytes, without parsing
+            print(f"[-] ID {course_id}: No course found ({page_kind})")
             return None
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = BeautifulSoup(content, 'html.parser')
         
         # Check if page has content (sometimes ID exists but page is empty/redirect)
         title_tag = soup.select_one('h5.card-title')
@@ -44,23 +175,12 @@ def scrape_course(course_id, session, base_headers):
         else:
             data['Course Name'] = "N/A"
 
-        # Helper to find values based on labels
+        # Helper to find values based on labels: the page is walked once and every
+        # label below is then answered from that index (div.label -> div.value, then p -> p)
+        label_index = LabelIndex(SoupPage(soup))
+
         def find_value_by_label(label_text):
-            # Try type A: .label -> .value
-            label_div = soup.find('div', class_='label', string=lambda t: t and label_text.lower() in t.lower())
-            if label_div:
-                value_div = label_div.find_next_sibling('div', class_='value')
-                if value_div:
-                    return value_div.get_text(strip=True)
-            
-            # Try type B: p text -> p next sibling
-            label_p = soup.find(lambda tag: tag.name == 'p' and label_text.lower() == tag.get_text(strip=True).lower())
-            if label_p:
-               value_p = label_p.find_next_sibling('p')
-               if value_p:
-                   return value_p.get_text(strip=True)
-            
-            return "N/A"
+            return label_index.find(label_text, layouts=("div", "p"))
 
         data['Method'] = find_value_by_label("Method")
         data['Duration'] = find_value_by_label("Duration")
@@ -113,14 +233,243 @@ def scrape_course(course_id, session, base_headers):
         print(f"[-] ID {course_id}: Error - {e}")
         return None
 
+# ------------------------------------------------------------------------------
+# 3. ONE RUN (what every engine shares)
+# ------------------------------------------------------------------------------
+
+class ScraperRun:
+    """
+    Everything the steps of one run share: the settings from config.kml, the
+    page cache, the checkpoint, the memory of empty IDs, the fingerprints and
+    the output. Every engine below hands its pages to read_and_finish() or
+    finish(), so they all save rows and notes in the same way.
+    """
+
+    def __init__(self, args, config, headers, id_range, cache=None, checkpoint=None, empty_ids=None, changes=None):
+        self.args = args
+        self.config = config
+        self.headers = headers
+        self.id_range = id_range
+        self.settings = section_settings(config, "http", DEFAULT_HTTP_SETTINGS)
+        # The quick page check uses the "page_rules" of config.kml, like the async engine does
+        self.page_rules = compile_page_rules(config)
+        self.cache = cache
+        self.checkpoint = checkpoint
+        self.empty_ids = empty_ids
+        self.changes = changes
+        # Set once output.csv is open (see main)
+        self.writer = None
+        self.output = None
+        # ID (as text) -> page fingerprint of the rows waiting to be written
+        self.new_fingerprints = {}
+
+    def note(self, current_id, status):
+        """Notes how one ID went, in the checkpoint and in the memory of empty IDs."""
+        if self.checkpoint:
+            self.checkpoint.mark(current_id, status)
+        if self.empty_ids:
+            self.empty_ids.record(current_id, status)
+        if self.changes and status == STATUS_EMPTY:
+            self.changes.gone(current_id)
+
+    def check_page(self, result):
+        """
+        The fingerprint stage: returns the fingerprint of a downloaded course page
+        (or None) and whether the course is unchanged since the last run.
+        """
+        if not self.changes or result.error is not None or result.status_code == 304:
+            return None, False
+        if classify_page(result.content, self.page_rules, result.status_code) != PAGE_VALID:
+            return None, False
+        fingerprint = self.changes.page_fingerprint(result.content)
+        return fingerprint, self.changes.page_unchanged(result.course_id, fingerprint) and not self.args.write_unchanged
+
+    def skip_unchanged(self, current_id, fingerprint=None):
+        """Finishes an ID whose course has not changed, without writing a row."""
+        self.changes.mark_unchanged(current_id, fingerprint)
+        self.output.add(current_id, None)
+        self.note(current_id, STATUS_DONE)
+
+    def read_and_finish(self, result):
+        """Reads a downloaded page (unless it is unchanged) and finishes its ID."""
+        fingerprint, unchanged = self.check_page(result)
+        if unchanged:
+            save_to_cache(self.cache, result.url, result.content, result.status_code, self.page_rules, result.headers)
+            print(f"[+] ID {result.course_id}: Unchanged since the last run")
+            self.skip_unchanged(result.course_id)
+            return
+        info = read_fetched(result, self.page_rules, self.cache)
+        self.finish(result.course_id, info, page_status(result, info, self.page_rules, self.cache), fingerprint)
+
+    def finish(self, current_id, info, status, fingerprint=None):
+        """Hands the row for one ID to the writer, and notes how the ID went."""
+        if info and self.changes:
+            if self.changes.compare(current_id, info) == CHANGE_SAME and not self.args.write_unchanged:
+                # Same row as last time: it is already in output.csv
+                print(f"[+] ID {current_id}: Unchanged since the last run (row not written again)")
+                self.skip_unchanged(current_id, fingerprint)
+                return
+            self.new_fingerprints[str(current_id)] = fingerprint
+        self.output.add(current_id, info)
+        # A row only counts as done once it is really in the file (see save_row)
+        if not info:
+            self.note(current_id, status)
+
+    def save_row(self, row):
+        self.writer.writerow(row)
+        self.note(row['ID'], STATUS_DONE)
+        if self.changes:
+            # The fingerprints only count once the row is really in the file
+            self.changes.update(row['ID'], row, self.new_fingerprints.pop(str(row['ID']), None))
+
+    def cached_page(self, current_id):
+        """Returns the saved copy to use for this ID, or None if it must be downloaded."""
+        return self.cache.lookup(course_url(current_id)) if self.cache else None
+
+    def use_saved_copy(self, current_id):
+        """
+        Finishes an ID from its saved copy, or skips it in --cache-only mode.
+        Returns False if the page must be downloaded.
+        """
+        cached = self.cached_page(current_id)
+        if cached is not None:
+            # Only real course pages and empty pages are ever saved
+            self.finish(current_id, read_saved_copy(current_id, course_url(current_id), cached, self.cache,
+                                                    self.page_rules), STATUS_EMPTY)
+        elif self.cache and self.cache.mode == CACHE_ONLY:
+            print(f"[-] ID {current_id}: Not in the page cache (skipped)")
+            self.output.add(current_id, None)
+        else:
+            return False
+        return True
+
+    def ids_to_download(self):
+        """Handles the IDs that have a saved copy straight away and returns the rest."""
+        return [current_id for current_id in self.id_range if not self.use_saved_copy(current_id)]
+
+# ------------------------------------------------------------------------------
+# 4. THE ENGINES (the "engine" in the "http" part of config.kml)
+# ------------------------------------------------------------------------------
+
+def run_sequential(run, session):
+    """One page at a time, with the page cache checked just before each page."""
+    # The speed limit replaces the old fixed 30 second pause and adapts to how
+    # the website is coping
+    limiter = AdaptiveRateLimiter.from_config(run.config, rate_cap=run.settings["requests_per_second"])
+    for current_id in run.id_range:
+        if run.use_saved_copy(current_id):
+            continue
+        # Delay to avoid rate limiting
+        limiter.wait()
+        result = fetch_course(current_id, session, run.headers, run.page_rules, limiter, run.cache,
+                              run.settings["timeout"])
+        run.read_and_finish(result)
+
+
+def run_async(run):
+    """
+    Several pages in flight at once, under one shared requests-per-second limit.
+    This engine talks to the website with httpx instead of cloudscraper, so it
+    can't get past a Cloudflare challenge (see readme.md).
+    """
+    # Saved pages are handled straight away; only the rest are downloaded
+    jobs = []
+    for current_id in run.ids_to_download():
+        url = course_url(current_id)
+        # Older saved copies are only downloaded again if they changed
+        saved = run.cache.revalidation_copy(url) if run.cache else None
+        jobs.append((current_id, url, conditional_headers(saved)))
+
+    engine = AsyncFetchEngine.from_config(run.config, run.headers)
+    if jobs:
+        print(f"\n[+] Fetching up to {engine.concurrency} pages at a time, "
+              f"at most {engine.requests_per_second} requests per second")
+    engine.run(jobs, run.read_and_finish)
+
+
+def run_pipeline(run):
+    """
+    Download, read and save at the same time (see pipeline.py): saved pages
+    are handled straight away, the rest go down the line.
+    """
+    jobs = run.ids_to_download()
+    pipeline = Pipeline.from_config(run.config)
+    limiter = AdaptiveRateLimiter.from_config(run.config, rate_cap=run.settings["requests_per_second"])
+    # Every download thread gets its own session
+    local = threading.local()
+    # ID -> (fingerprint, unchanged?), worked out by the download threads,
+    # so unchanged pages are never sent to the readers
+    checked_pages = {}
+
+    def fetch(current_id):
+        if not hasattr(local, "session"):
+            local.session = cloudscraper.create_scraper()
+        limiter.wait()
+        result = fetch_course(current_id, local.session, run.headers, run.page_rules, limiter, run.cache,
+                              run.settings["timeout"])
+        if result.error is None and result.status_code != 304:
+            save_to_cache(run.cache, result.url, result.content, result.status_code, run.page_rules, result.headers)
+        checked_pages[current_id] = run.check_page(result)
+        return result
+
+    def unchanged(result):
+        return checked_pages.get(result.course_id, (None, False))[1]
+
+    def write(current_id, result, info, error):
+        fingerprint, page_unchanged = checked_pages.pop(current_id, (None, False))
+        if error is None:
+            error = result.error
+        if error is not None:
+            print(f"[-] ID {current_id}: Error - {error}")
+            run.finish(current_id, None, STATUS_ERROR)
+            return
+        if page_unchanged:
+            print(f"[+] ID {current_id}: Unchanged since the last run")
+            run.skip_unchanged(current_id)
+            return
+        if result.status_code == 304:
+            info = handle_not_modified(current_id, result.url, result.headers, run.cache, run.page_rules)
+        elif run.cache and info:
+            run.cache.save_record(result.url, RECORD_TAG, info)
+        run.finish(current_id, info, page_status(result, info, run.page_rules, run.cache), fingerprint)
+
+    if jobs:
+        readers = (f"{pipeline.parse_workers} process{'es' if pipeline.parse_workers > 1 else ''}"
+                   if pipeline.parse_workers else "one thread")
+        print(f"\n[+] Downloading up to {pipeline.fetch_workers} pages at a time, reading them with {readers}")
+    # A partial of a top-level function can still be sent to the reader processes
+    pipeline.run(jobs, fetch, partial(parse_fetched, rules=run.page_rules), write, skip_parse=unchanged)
+
+# ------------------------------------------------------------------------------
+# 5. THE MAIN SCRIPT PROCESS
+# ------------------------------------------------------------------------------
+
 def main():
     print("--- Peneraju Course Scraper ---")
-    try:
-        start_id = int(input("Enter Start ID: "))
-        end_id = int(input("Enter End ID: "))
-    except ValueError:
-        print("Error: IDs must be integers.")
-        return
+    parser = argparse.ArgumentParser(description="Peneraju Course Scraper")
+    add_cache_arguments(parser)
+    add_output_arguments(parser)
+    add_checkpoint_arguments(parser)
+    add_empty_id_arguments(parser)
+    add_plan_arguments(parser)
+    add_change_arguments(parser)
+    args = parser.parse_args()
+    if args.plan:
+        # The IDs come from a crawl plan made by discovery.py
+        try:
+            plan_ids = load_plan_ids(args.plan)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error: could not read the crawl plan '{args.plan}': {e}")
+            return
+        print(f"[+] Following the crawl plan '{args.plan}' ({len(plan_ids)} IDs)")
+    else:
+        plan_ids = None
+        try:
+            start_id = int(input("Enter Start ID: "))
+            end_id = int(input("Enter End ID: "))
+        except ValueError:
+            print("Error: IDs must be integers.")
+            return
     
     # Prompt for Cookie to bypass captcha
     print("\n[!] If you are hitting CAPTCHA blocks:")
@@ -130,12 +479,15 @@ def main():
     print("4. Copy the entire 'Cookie' value (or just PHPSESSID=...).")
     cookie_input = input("Enter Cookie String (Press Enter to skip): ").strip()
 
-    # Determine step direction
-    step = 1 if start_id <= end_id else -1
-    # Adjust range to be inclusive of end_id
-    id_range = range(start_id, end_id + step, step)
+    if plan_ids is not None:
+        id_range = plan_ids
+    else:
+        # Determine step direction
+        step = 1 if start_id <= end_id else -1
+        # Adjust range to be inclusive of end_id
+        id_range = range(start_id, end_id + step, step)
 
-    fieldnames = ['ID', 'Course Name', 'Method', 'Duration', 'ALTI Name', 'Issuer', 'Phone', 'Email', 'Web']
+    fieldnames = FIELDNAMES
     output_file = "output.csv"
     
     # Check if file exists to decide whether to write header
@@ -159,19 +511,64 @@ def main():
     if cookie_input:
         headers['Cookie'] = cookie_input
 
+    # Optional speed settings from config.kml (the "http" part); the shipped
+    # config.kml (and no config.kml at all) fetches one page at a time, like before
+    config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.kml")
+    config = load_config(config_path) if os.path.isfile(config_path) else {}
+    settings = section_settings(config, "http", DEFAULT_HTTP_SETTINGS)
+
+    # Pages downloaded earlier (the "cache" part of config.kml) are read from disk
+    # instead of the website; None when the cache is switched off
+    cache = PageCache.from_config(config, cache_mode(args), base_dir=os.path.dirname(os.path.abspath(__file__)))
+
+    # Carry on where an interrupted run stopped (the "checkpoint" part of config.kml):
+    # IDs already finished, or already in output.csv, are not visited again
+    checkpoint = Checkpoint.from_config(config, "scraper.py", base_dir=os.path.dirname(os.path.abspath(__file__)))
+    id_range = plan_run(checkpoint, id_range, output_file, args.start_over)
+
+    # IDs that had no course last time are only visited again once they are due
+    # for a re-check (the "empty_ids" part of config.kml)
+    empty_ids = EmptyIdCache.from_config(config, course_url("{var_id}"), base_dir=os.path.dirname(os.path.abspath(__file__)))
+    id_range = skip_known_empty(empty_ids, id_range, args.recheck_empty)
+
+    # Fingerprints of the courses seen before (the "changes" part of config.kml):
+    # unchanged pages are not read again and their rows are not written again
+    changes = ChangeTracker.from_config(config, RECORD_TAG, base_dir=os.path.dirname(os.path.abspath(__file__)))
+
+    run = ScraperRun(args, config, headers, id_range, cache, checkpoint, empty_ids, changes)
+
     # Use buffering=1 for line-buffered writing; 'a' for append
     with open(output_file, "a", encoding="utf-8", newline='', buffering=1) as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        run.writer = csv.DictWriter(f, fieldnames=fieldnames)
         
         if not file_exists:
-            writer.writeheader()
+            run.writer.writeheader()
         
-        for current_id in id_range:
-            info = scrape_course(current_id, session, headers)
-            if info:
-                writer.writerow(info)
-            # Delay to avoid rate limiting
-            time.sleep(30)
+        # Rows go through the reorder buffer, so they are written in ID order
+        # even when pages finish out of order (unless "ordered" is switched off)
+        run.output = ReorderBuffer.from_config(config, id_range, run.save_row, args)
+        try:
+            if settings["engine"] == "async":
+                run_async(run)
+            elif settings["engine"] == "pipeline":
+                run_pipeline(run)
+            else:
+                run_sequential(run, session)
+        finally:
+            # Write the rows still waiting for a slower ID (e.g. after Ctrl+C)
+            run.output.close()
+
+    if cache:
+        cache.close()
+    if checkpoint:
+        if checkpoint.forget_if_complete(id_range):
+            print("\n[+] Every ID is finished, so the checkpoint was cleared for the next run")
+        checkpoint.close()
+    if empty_ids:
+        empty_ids.close()
+    if changes:
+        report_changes(changes)
+        changes.close()
     
     print("\nDone! Results saved to output.csv")
 
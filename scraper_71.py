@@ -14,137 +14,51 @@
 import csv          # Helps us create and save an Excel-friendly output file
 import os           # Helps us work with files and folders on your computer
 import time         # Helps us add pauses/delays so we don't overwhelm the website
-import random       # Helps us choose random numbers (for random delays)
-import json         # Helps us read the 'config.kml' file which is written in JSON format
-from bs4 import BeautifulSoup   # Helps us read and search through the website's text
+import argparse     # Helps us read extra options typed after the script name (like --parser)
+from collections import Counter # Helps us count things (like how many pages were empty)
 from selenium import webdriver  # Helps us control the Chrome browser automatically
-from selenium.webdriver.chrome.service import Service  # Connects Python to Chrome
-from webdriver_manager.chrome import ChromeDriverManager # Automatically gets the right Chrome tool
+from selenium.common.exceptions import WebDriverException, TimeoutException # The kinds of error Chrome reports
+from extraction import load_config, compile_plan, plan_signature, parse_html, classify_page, PARSER_BACKENDS, PAGE_CAPTCHA, PAGE_VALID, PAGE_EMPTY # Our own helper that reads the course details from a page
+from rate_limiter import AdaptiveRateLimiter # Our own speed limit that slows down or speeds up by listening to the website
+from page_cache import PageCache, add_cache_arguments, cache_mode, CACHE_ONLY # Our own store of pages downloaded earlier
+from reorder import ReorderBuffer, add_output_arguments # Our own helper that writes the rows in ID order
+from parking import ParkingLot, add_captcha_arguments, captcha_settings # Our own list of IDs that hit a robot check
+from checkpoint import Checkpoint, add_checkpoint_arguments, plan_run, STATUS_DONE, STATUS_EMPTY, STATUS_CAPTCHA, STATUS_ERROR # Our own notes of which IDs are finished
+from empty_ids import EmptyIdCache, add_empty_id_arguments, skip_known_empty # Our own memory of IDs without a course
+from discovery import add_plan_arguments, load_plan_ids # Our own crawl plans, made by discovery.py
+from changes import ChangeTracker, add_change_arguments, report_changes, CHANGE_SAME # Our own fingerprints of the courses seen before
+from browser_pool import BrowserPool, recycle_policy # Our own helper that runs several Chrome windows at once
+from browser import DEFAULT_BROWSER_SETTINGS, blocked_url_patterns, chrome_options, block_resources, compile_readiness, wait_until_ready, READY_TIMEOUT # Our own Chrome helpers
+from browser import resolve_driver_path, chrome_service # Our own helper that finds the right Chrome driver quickly
+from store import section_settings # Our own helper that reads one part of config.kml
+from browser import browser_plan, extract_in_browser, differing_fields, EXTRACTION_MODES # Our own helper that reads pages inside Chrome
 
 # ------------------------------------------------------------------------------
 # 2. DEFINING HELPER FUNCTIONS (Mini-tasks)
 # ------------------------------------------------------------------------------
 
-def load_config(config_file="config.kml"):
+def parse_args():
     """
-    This function looks for your settings file (config.kml) and reads the instructions inside it.
-    If it can't find the file or the file is broken, it will let you know.
+    This function reads the optional extras you can type after the script name.
+    Running 'python scraper_71.py' on its own works exactly as before.
     """
-    try:
-        # Open the settings file in "read" mode
-        with open(config_file, "r", encoding="utf-8") as f:
-            return json.load(f) # Convert the file's text into an organized setting our script can use
-    except Exception as e:
-        # If something goes wrong, print an error message on the screen
-        print(f"[-] Error loading {config_file}: {e}")
-        return None
-
-def parse_html(html_content, course_id, config):
-    """
-    This function takes the raw webpage code (HTML) and uses your settings to find
-    the specific pieces of information you want (like 'Programme Name', 'Duration', etc.).
-    """
-    # Load the webpage code into BeautifulSoup, making it easy to search
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # First, check if the page actually has the right content by looking for a hidden title box
-    title_tag = soup.select_one('h5.card-title')
-    if not title_tag:
-        # If we can't find a title, check if the website thinks we are a robot (CAPTCHA/Validation)
-        if "Validation request" in str(soup):
-            return "CAPTCHA" # Let the main script know we hit a robot-check
-        return None # Let the main script know this page is empty/invalid
-
-    # Create an empty dictionary (like a bucket) to store the data we find
-    data = {}
-    data['ID'] = str(course_id) # Save the current ID number first
-    
-    # Get the list of information we want to find from the settings file
-    fields_to_extract = config.get('fields', [])
-    
-    # If the settings file uses an older format ('labels' instead of 'fields'), fix it
-    if not fields_to_extract:
-        old_labels = config.get('labels', [])
-        for l in old_labels:
-            fields_to_extract.append({"name": l, "extract": "generic_label"})
-            
-    # Now, go through each piece of information we want (like "Programme Name", "Phone")
-    for field in fields_to_extract:
-        label_name = field.get("name") # The name of the information (e.g., "Email")
-        extract_type = field.get("extract", "generic_label") # The method we use to find it
-        selector = field.get("selector") # The specific hidden code block to look inside
-        
-        found_val = "N/A" # Assume we won't find it at first
-        
-        # Method 1: finding straight text inside a specific code block
-        if extract_type == "text" and selector:
-            element = soup.select_one(selector)
-            if element:
-                t = element.find(string=True, recursive=False)
-                found_val = t.strip() if t and t.strip() else element.get_text(strip=True)
-                
-        # Method 2: finding text slightly outside the specific code block
-        elif extract_type == "parent_text" and selector:
-            element = soup.select_one(selector)
-            if element and element.parent:
-                found_val = element.parent.get_text(strip=True)
-                
-        # Method 3: finding hidden links or attributes (like website addresses or mailto links)
-        elif extract_type == "attribute" and selector:
-            element = soup.select_one(selector)
-            if element:
-                attr = field.get("attribute", "href")
-                val = element.get(attr, "")
-                if val:
-                    prefix = field.get("remove_prefix") # E.g., removing "mailto:" from an email link
-                    if prefix:
-                        val = val.replace(prefix, "")
-                    found_val = val.strip()
-                    
-        # Method 4: finding a link directly after a specific block
-        elif extract_type == "next_tag_attribute" and selector:
-            element = soup.select_one(selector)
-            if element:
-                next_tag = field.get("next_tag", "a")
-                link = element.find_next(next_tag)
-                if link:
-                    attr = field.get("attribute", "href")
-                    found_val = link.get(attr, "N/A").strip()
-                    
-        # Method 5: finding data matching a standard label block on the website
-        elif extract_type == "generic_label":
-            # Search for a block with class 'label' that matches our label_name
-            label_div = soup.find('div', class_='label', string=lambda t: t and label_name.lower() in t.lower())
-            if label_div:
-                value_div = label_div.find_next_sibling('div', class_='value')
-                if value_div:
-                    found_val = value_div.get_text(strip=True)
-            
-            # Search for a standard paragraph <p> tag
-            if found_val == "N/A":
-                label_p = soup.find(lambda tag: tag.name == 'p' and label_name.lower() == tag.get_text(strip=True).lower())
-                if label_p:
-                   value_p = label_p.find_next_sibling('p')
-                   if value_p:
-                       found_val = value_p.get_text(strip=True)
-                       
-            # Search for a <label> tag
-            if found_val == "N/A":
-                label_tag = soup.find('label', string=lambda t: t and label_name.lower() in t.lower())
-                if label_tag:
-                    value_span = label_tag.find_next_sibling('span')
-                    if value_span:
-                        found_val = value_span.get_text(strip=True)
-                    else:
-                        value_div = label_tag.find_next_sibling('div')
-                        if value_div:
-                            found_val = value_div.get_text(strip=True)
-                            
-        # Save whatever we found (or "N/A" if nothing) into our bucket
-        data[label_name] = found_val
-
-    # Return the bucket of data back to the main script
-    return data
+    parser = argparse.ArgumentParser(description="Dynamic Configurable Selenium Scraper (App 71)")
+    parser.add_argument("--parser", choices=sorted(PARSER_BACKENDS),
+                        help="Which page reader to use (overrides 'parser_backend' in config.kml)")
+    parser.add_argument("--workers", type=int,
+                        help="How many Chrome windows to use at the same time (overrides 'workers' in config.kml)")
+    parser.add_argument("--extraction", choices=EXTRACTION_MODES,
+                        help="Where to find the fields: 'python', 'browser' or 'verify' (overrides 'extraction' in config.kml)")
+    parser.add_argument("--headless", action="store_true",
+                        help="Run Chrome without showing its window (you can't solve robot checks by hand then)")
+    add_cache_arguments(parser)
+    add_output_arguments(parser)
+    add_captcha_arguments(parser)
+    add_checkpoint_arguments(parser)
+    add_empty_id_arguments(parser)
+    add_plan_arguments(parser)
+    add_change_arguments(parser)
+    return parser.parse_args()
 
 # ------------------------------------------------------------------------------
 # 3. THE MAIN SCRIPT PROCESS
@@ -152,6 +66,7 @@ def parse_html(html_content, course_id, config):
 def main():
     # Print a welcome title on the black terminal screen
     print("--- Dynamic Configurable Selenium Scraper (App 71) ---")
+    args = parse_args()
     
     # Find exactly where this script is saved on your computer, 
     # so we know where to look for the 'config.kml' file
@@ -168,17 +83,50 @@ def main():
     # Read settings like the webpage address, start ID, and end ID
     url_template = config.get("url_template", "https://peneraju.org/course-details?id={var_id}")
     base_url = config.get("base_url", "https://peneraju.org")
-    fields = config.get("fields", [])
-    if fields:
-        labels = [f.get("name") for f in fields]
-    else:
-        labels = config.get("labels", [])
+
+    # Turn the 'fields' instructions into a ready-made checklist ONCE, so every page
+    # can re-use it instead of re-reading the settings again and again
+    try:
+        plan = compile_plan(config, backend=args.parser)
+    except ValueError as e:
+        print(f"[-] {e}")
+        return
+    labels = [rule.name for rule in plan.fields]
+
+    # How to tell that a page has finished loading (the "readiness" part of config.kml)
+    readiness = compile_readiness(config)
     
     start_id = config.get("start_id")
     end_id = config.get("end_id")
 
+    # What to do when a robot check shows up (the "captcha" part of config.kml):
+    # "park" writes the ID down for later and carries on, "ask" waits for you straight away
+    try:
+        on_captcha = captcha_settings(config)["on_captcha"]
+    except ValueError as e:
+        print(f"[-] {e}")
+        return
+    parking = ParkingLot.from_config(config, base_dir=script_dir)
+    if args.clear_captchas:
+        # Only the parked IDs are visited, and this time we ask you to solve each robot check
+        if not len(parking):
+            print("[+] No IDs are waiting for a robot check.")
+            return
+        print(f"[+] Visiting the {len(parking)} ID(s) parked after a robot check")
+        on_captcha = "ask"
+
+    # With --plan, the IDs come from a crawl plan made by discovery.py instead
+    plan_ids = None
+    if args.plan and not args.clear_captchas:
+        try:
+            plan_ids = load_plan_ids(args.plan)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[-] Could not read the crawl plan '{args.plan}': {e}")
+            return
+        print(f"[+] Following the crawl plan '{args.plan}' ({len(plan_ids)} IDs)")
+
     # If the Start and End IDs aren't in the settings file, ask the user to type them in
-    if start_id is None or end_id is None:
+    if not args.clear_captchas and plan_ids is None and (start_id is None or end_id is None):
         try:
             start_id = int(input("Enter Start ID (e.g., 100): "))
             end_id = int(input("Enter End ID (e.g., 105): "))
@@ -187,24 +135,202 @@ def main():
             return
 
     # 2. OPEN GOOGLE CHROME
-    print("\n[+] Launching Chrome...")
-    options = webdriver.ChromeOptions()
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    
-    # This automatically downloads and uses the correct Chrome driver
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    # How Chrome should run (the "browser" part of config.kml): how many windows to
+    # use at the same time, whether to hide them, and what not to download
+    settings = section_settings(config, "browser", DEFAULT_BROWSER_SETTINGS)
+    if args.headless:
+        settings["headless"] = True
+    workers = args.workers or settings["workers"]
+
+    # Where the fields are found: "python" (copy the page out of Chrome first),
+    # "browser" (inside Chrome itself) or "verify" (both, to compare them)
+    extraction = args.extraction or settings["extraction"]
+    if extraction not in EXTRACTION_MODES:
+        print(f"[-] Unknown extraction '{extraction}' (choose from: {', '.join(EXTRACTION_MODES)})")
+        return
+    script_plan = browser_plan(plan)
+    try:
+        blocked_url_patterns(settings)
+    except ValueError as e:
+        print(f"[-] {e}")
+        return
+
+    # Find the Chrome driver that matches your Chrome: straight from memory when
+    # Chrome hasn't changed, and only looked up online after a Chrome update
+    try:
+        driver_path = resolve_driver_path(settings, base_dir=script_dir)
+    except ValueError as e:
+        print(f"[-] {e}")
+        return
+
+    def make_driver():
+        """This function opens one new Chrome window that the script can control."""
+        driver = webdriver.Chrome(service=chrome_service(driver_path), options=chrome_options(settings))
+        # Don't download pictures, fonts and tracking scripts: we only need the text
+        block_resources(driver, settings)
+        return driver
+
+    # Our group of Chrome windows; questions for you all go through its one "desk".
+    # Each window is closed and opened again (keeping its cookies) after many pages,
+    # when it uses too much memory, or after several errors in a row.
+    pool = BrowserPool(make_driver, workers, recycle=recycle_policy(settings), home_url=base_url)
+    desk = pool.desk
+
+    # Keep a tally of what kind of pages we saw (real course, robot-check, empty)
+    page_counts = Counter()
+
+    # Our speed limit (the "rate_limit" part of config.kml): it waits between pages
+    # like a slow human, slows down when the website struggles and speeds up when it's happy.
+    # All the Chrome windows share this one speed limit.
+    limiter = AdaptiveRateLimiter.from_config(config)
+
+    # Our store of pages downloaded earlier (the "cache" part of config.kml), or None
+    # if it is switched off. A page saved recently is read from disk instead of Chrome.
+    cache = PageCache.from_config(config, cache_mode(args), base_dir=script_dir)
+
+    # Our notes of how every ID went (the "checkpoint" part of config.kml), so a run
+    # that was stopped halfway carries on where it stopped. None if switched off.
+    checkpoint = Checkpoint.from_config(config, "scraper_71.py", base_dir=script_dir)
+
+    # Our memory of IDs that had no course last time (the "empty_ids" part of config.kml):
+    # they are only visited again once they are due for a re-check. None if switched off.
+    empty_ids = EmptyIdCache.from_config(config, url_template, base_dir=script_dir)
+
+    # Our fingerprints of the courses seen before (the "changes" part of config.kml):
+    # a course that hasn't changed is not read again and its row is not saved again.
+    # They are labelled with the field rules, so after a change of "fields" in
+    # config.kml every course is read again. None if switched off.
+    changes = ChangeTracker.from_config(config, "scraper_71.py:" + plan_signature(plan), base_dir=script_dir)
+    # ID (as text) -> page fingerprint of the rows waiting to be saved
+    new_fingerprints = {}
+
+    def note(current_id, status):
+        """This function notes how one ID went, in the checkpoint and in the memory of empty IDs."""
+        if checkpoint:
+            checkpoint.mark(current_id, status)
+        if empty_ids:
+            empty_ids.record(current_id, status)
+        if changes and status == STATUS_EMPTY:
+            # A course that was here last time is gone now
+            changes.gone(current_id)
+
+    def read_open_page(driver, current_id):
+        """
+        This function reads the page that is open in a Chrome window. It returns
+        the kind of page, the result (bucket of data, "CAPTCHA" or None) and the
+        page's code, which is None when the page was read inside Chrome.
+        When the page is read the Python way, the result is None for now: the
+        main script reads the page's code later, while Chrome opens the next page.
+        """
+        if extraction != "python":
+            try:
+                # Let Chrome find the fields itself, so only the answers travel back to us
+                page_kind, result = extract_in_browser(driver, script_plan, current_id)
+            except WebDriverException as e:
+                print(f"[!] ID {current_id}: Reading inside Chrome failed, using Python instead ({e.msg})")
+            else:
+                if extraction == "browser":
+                    return page_kind, result, None
+                # "verify": read it the Python way too, and warn if the two answers differ
+                html = driver.page_source
+                python_result = parse_html(html, current_id, plan)
+                different = differing_fields(result, python_result)
+                if different:
+                    print(f"[!] ID {current_id}: Chrome and Python read these fields differently: {', '.join(different)}")
+                return classify_page(html, plan), python_result, html
+
+        # Grab everything written on the page
+        html = driver.page_source
+
+        # Quickly check what kind of page this is (real course, robot-check or empty)
+        # just by looking at its text. The slow part (picking out the fields) is left
+        # to the main script, so this window can move on to the next ID straight away
+        return classify_page(html, plan), None, html
+
+    def visit_page(worker, driver, current_id):
+        """
+        This function is run by one Chrome window (worker) for one course ID.
+        It returns the kind of page it found, the bucket of data (or None) and
+        the page's code when the main script still has to read it (or None).
+        The kind is None when the page was skipped because it isn't in the cache.
+        """
+        # Replace the '{var_id}' in the link with our current number (e.g., 100, 101...)
+        url = url_template.replace("{var_id}", str(current_id))
+
+        # Did we save this page recently? Then there is no need to visit it again
+        cached = cache.lookup(url) if cache else None
+        if cached is None and cache and cache.mode == CACHE_ONLY:
+            return None, None, None
+
+        if cached is not None:
+            html = cached.content.decode("utf-8", errors="replace")
+            page_kind, result = classify_page(html, plan), None
+        else:
+            # IMPORTANT: Wait for our turn before going to the next page.
+            # This keeps us from getting banned! (Saved pages don't need to wait.)
+            limiter.wait()
+
+            # Tell Chrome to go to the page
+            started = time.monotonic()
+            driver.get(url)
+            # Wait until the course title (or a robot check, or a "not found" message)
+            # shows up, instead of always waiting 2 seconds
+            ready = wait_until_ready(driver, readiness)
+            if ready == READY_TIMEOUT:
+                # A half-loaded page is not read, saved or taken as empty: it is an
+                # error, so the ID is visited again next run
+                limiter.record(latency=time.monotonic() - started)
+                raise TimeoutException(f"the page did not finish loading within {readiness.timeout} seconds")
+            page_kind, result, html = read_open_page(driver, current_id)
+
+            # Tell the speed limit how long the page took and whether we hit a robot-check
+            limiter.record(latency=time.monotonic() - started, captcha=page_kind == PAGE_CAPTCHA)
+
+            # Keep a copy of real course pages and empty pages for the next run
+            # (robot-check pages are never saved, and pages read inside Chrome can't be)
+            if cache and html is not None and page_kind in (PAGE_VALID, PAGE_EMPTY):
+                cache.put(url, html)
+
+        # Sometimes the website randomly throws up another robot check
+        # (this is spotted here, while the robot check is still open in this window)
+        if (page_kind == PAGE_CAPTCHA or result == "CAPTCHA") and on_captcha == "park":
+            # Nobody may be around: the main script parks this ID for later and
+            # this window simply carries on (the speed limit has already slowed down)
+            return page_kind, "CAPTCHA", None
+        if page_kind == PAGE_CAPTCHA or result == "CAPTCHA":
+            # Ask at most twice: a page that still shows the robot check after that is
+            # handed back as "still a robot check" (an error, so it is visited again next run)
+            for problem in ("Hit a security check (CAPTCHA)!", "The security check is still there!"):
+                desk.ask(f"[-] ID {current_id}: {problem}",
+                         f"    Please look at Chrome window {worker} and solve it.",
+                         "    Press ENTER here to continue after you solved it > ")
+                # Now read the page again since we solved the problem
+                if wait_until_ready(driver, readiness) == READY_TIMEOUT:
+                    raise TimeoutException(f"the page did not finish loading within {readiness.timeout} seconds")
+                solved_kind, result, html = read_open_page(driver, current_id)
+                if solved_kind != PAGE_CAPTCHA and result != "CAPTCHA":
+                    break
+            else:
+                return PAGE_CAPTCHA, None, None
+            if cache and html is not None and solved_kind == PAGE_VALID:
+                cache.put(url, html)
+        # Only the page's code is handed back when it still has to be read. The
+        # hand-back queue is small, so a window waits if the main script falls behind
+        return page_kind, result, (html if result is None else None)
 
     try:
         # Before we start scraping fast, go to the homepage slowly
         # This helps the website think we are a real human, not a robot
+        print(f"\n[+] Launching Chrome ({pool.size} window{'s' if pool.size > 1 else ''})...")
+        pool.start()
         print(f"\n[!] Navigating to {base_url}...")
-        driver.get(base_url)
+        for driver in pool.drivers:
+            driver.get(base_url)
         
         # Display an instruction box for the user
         print("\n" + "="*60)
         print("ACTION REQUIRED:")
-        print("1. Check the opened Chrome window.")
+        print("1. Check the opened Chrome window(s).")
         print("2. If you see a 'Cloudflare' or 'Verify you are human' box, click to SOLVE IT.")
         print("3. Wait until you see the actual homepage loaded completely.")
         print("="*60)
@@ -213,73 +339,161 @@ def main():
 
         # 3. PREPARE TO SAVE THE DATA
         # Figure out if we are counting upwards (e.g., 100 to 105) or backwards
-        step = 1 if start_id <= end_id else -1
-        id_range = range(start_id, end_id + step, step)
+        # (with --clear-captchas, only the parked IDs are visited)
+        if args.clear_captchas:
+            id_range = parking.ids()
+        elif plan_ids is not None:
+            id_range = plan_ids
+        else:
+            step = 1 if start_id <= end_id else -1
+            id_range = range(start_id, end_id + step, step)
 
         # Create the column headers for our Excel/CSV file (e.g., ID, Programme Name, Email)
-        fieldnames = ['ID'] + labels
+        # (the checklist already removed duplicate headers, like having two 'Phone' columns)
+        fieldnames = list(plan.fieldnames)
         output_file = os.path.join(script_dir, "output.csv")
         file_exists = os.path.isfile(output_file)
 
+        # Skip the IDs that an earlier, interrupted run already finished (or that
+        # already have a row in output.csv), so nothing is visited or saved twice
+        if not args.clear_captchas:
+            id_range = plan_run(checkpoint, id_range, output_file, args.start_over)
+            id_range = skip_known_empty(empty_ids, id_range, args.recheck_empty)
+
         # Open the 'output.csv' file in "append" mode (so we don't erase old data)
         with open(output_file, "a", encoding="utf-8", newline='', buffering=1) as f:
             
-            # Make sure we don't have duplicate headers (like having two 'Phone' columns)
-            unique_fieldnames = []
-            for field in fieldnames:
-                if field not in unique_fieldnames:
-                    unique_fieldnames.append(field)
-                    
-            # Setup our "writer" whose job is to put data nicely into the file columns
-            writer = csv.DictWriter(f, fieldnames=unique_fieldnames)
+            # Setup our "writer" whose job is to put data nicely into the file columns.
+            # Only this main part of the script ever writes: the Chrome windows just
+            # hand their results back here, so two rows can never get mixed up.
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
             
             # If the CSV file is brand new, write the header row at the very top
             if not file_exists:
                 writer.writeheader()
-            
+
+            def read_result(current_id, outcome, error):
+                """
+                This function shows what a Chrome window found for one ID and
+                returns the row to save (or None if there is nothing to save).
+                """
+                if error is not None:
+                    # If something breaks (like internet connection lost)
+                    print(f"[-] ID {current_id}: Error - {error}")
+                    note(current_id, STATUS_ERROR)
+                    return None
+                page_kind, result, html = outcome
+                if page_kind is None:
+                    print(f"[-] ID {current_id}: Not in the page cache (skipped)")
+                    return None
+                # Keep count for the summary at the end
+                page_counts[page_kind] += 1
+
+                # Has this course changed since the last run? The page's fingerprint
+                # ignores the security tokens that are different on every visit
+                fingerprint = None
+                if changes and html is not None and page_kind == PAGE_VALID:
+                    fingerprint = changes.page_fingerprint(html)
+                    if changes.page_unchanged(current_id, fingerprint) and not args.write_unchanged:
+                        parking.unpark(current_id)
+                        print(f"[+] ID {current_id}: Unchanged since the last run")
+                        changes.mark_unchanged(current_id)
+                        note(current_id, STATUS_DONE)
+                        return None
+
+                # Pick out the fields here, while the Chrome window is already busy
+                # with the next page (the browser is the slow part, not us)
+                if html is not None:
+                    try:
+                        result = parse_html(html, current_id, plan)
+                    except Exception as e:
+                        print(f"[-] ID {current_id}: Error - {e}")
+                        note(current_id, STATUS_ERROR)
+                        return None
+
+                if result == "CAPTCHA":
+                    # Write the ID down, so it can be visited again once someone solved the robot check
+                    parking.park(current_id, url_template.replace("{var_id}", str(current_id)))
+                    print(f"[!] ID {current_id}: Hit a security check (CAPTCHA), parked for later ({len(parking)} waiting)")
+                    note(current_id, STATUS_CAPTCHA)
+                    return None
+                # The page worked this time, so it no longer needs a person
+                parking.unpark(current_id)
+
+                # If we found real data
+                if result:
+                    # Find a nice name to display on the screen (so we know it worked)
+                    display_name = result.get('Programme Name', result.get('Course Name', result.get(labels[0] if labels else 'ID', 'Found')))
+                    if changes:
+                        if changes.compare(current_id, result) == CHANGE_SAME and not args.write_unchanged:
+                            # Same row as last time: it is already in output.csv
+                            print(f"[+] ID {current_id}: '{display_name}' (unchanged since the last run)")
+                            changes.mark_unchanged(current_id, fingerprint)
+                            note(current_id, STATUS_DONE)
+                            return None
+                        new_fingerprints[str(current_id)] = fingerprint
+                    print(f"[+] ID {current_id}: '{display_name}'")
+                    return result
+                elif page_kind == PAGE_CAPTCHA:
+                    # The robot check was still there after it was solved (twice)
+                    print(f"[-] ID {current_id}: Still a security check after solving it, noted as an error")
+                    note(current_id, STATUS_ERROR)
+                elif page_kind == PAGE_EMPTY:
+                    # If the page had no course on it
+                    print(f"[-] ID {current_id}: No info found")
+                    note(current_id, STATUS_EMPTY)
+                else:
+                    # The page looked like a course but its title could not be found:
+                    # noted as an error (not as empty), so it is visited again next run
+                    print(f"[-] ID {current_id}: Course page could not be read")
+                    note(current_id, STATUS_ERROR)
+                return None
+
+            def save_row(row):
+                """This function writes one row to the CSV file, then notes the ID as done."""
+                writer.writerow(row)
+                note(row['ID'], STATUS_DONE)
+                if changes:
+                    # The fingerprints only count once the row is really in the file
+                    changes.update(row['ID'], row, new_fingerprints.pop(str(row['ID']), None))
+
+            def visit_all(ids):
+                """This function lets the Chrome windows visit every ID in 'ids'."""
+                # Windows finish their pages in a slightly random order, so the rows wait
+                # in a "reorder buffer" and are written in ID order (unless "ordered" is off)
+                output = ReorderBuffer.from_config(config, ids, save_row, args)
+
+                def handle_result(current_id, outcome, error):
+                    """This function hands the row for one ID to our writer (via the reorder buffer)."""
+                    output.add(current_id, read_result(current_id, outcome, error))
+
+                # Every Chrome window takes the next ID from the list as soon as it is free
+                try:
+                    pool.run(ids, visit_page, handle_result)
+                finally:
+                    # Write the rows still waiting for a slower ID (e.g. after Ctrl+C)
+                    output.close()
+
             # 4. START VISITING EACH PAGE
-            for current_id in id_range:
-                # Replace the '{var_id}' in the link with our current number (e.g., 100, 101...)
-                url = url_template.replace("{var_id}", str(current_id))
+            visit_all(id_range)
+
+            # 5. THE IDs PARKED AFTER A ROBOT CHECK
+            # If someone is around, they can clear them now; otherwise they stay
+            # written down for 'python scraper_71.py --clear-captchas'
+            if len(parking) and on_captcha == "park":
                 try:
-                    # Tell Chrome to go to the page
-                    driver.get(url)
-                    time.sleep(2) # Give it 2 seconds to load
-                    
-                    # Grab everything written on the page
-                    html = driver.page_source
-                    
-                    # Send this raw page to our helper function to extract only the good stuff
-                    result = parse_html(html, current_id, config)
-                    
-                    # Sometimes the website randomly throws up another robot check
-                    if result == "CAPTCHA":
-                        print(f"[-] ID {current_id}: Hit a security check (CAPTCHA)!")
-                        print("    Please look at Chrome and solve it.")
-                        input("    Press ENTER here to continue after you solved it > ")
-                        # Now grab the page again since we solved the problem
-                        result = parse_html(driver.page_source, current_id, config)
-                    
-                    # If we found real data
-                    if result and result != "CAPTCHA":
-                        # Find a nice name to display on the screen (so we know it worked)
-                        display_name = result.get('Programme Name', result.get('Course Name', result.get(labels[0] if labels else 'ID', 'Found')))
-                        print(f"[+] ID {current_id}: '{display_name}'")
-                        
-                        # Tell our writer to save this data as a new row in the CSV file
-                        writer.writerow(result)
-                    else:
-                        # If page was empty or broken
-                        print(f"[-] ID {current_id}: No info found")
-
-                except Exception as e:
-                    # If something breaks (like internet connection lost)
-                    print(f"[-] ID {current_id}: Error - {e}")
-                
-                # IMPORTANT: Wait random amount of time (5 to 10 seconds) before going to the next page
-                # This makes the script act like a slow human, keeping us from getting banned!
-                sleep_time = random.uniform(5, 10)
-                time.sleep(sleep_time)
+                    answer = desk.ask(f"\n[!] {len(parking)} ID(s) hit a security check (CAPTCHA) and were parked.",
+                                      "    Solve the robot check in the Chrome window(s), then press ENTER to visit them again,",
+                                      "    or type 'later' to keep them for 'python scraper_71.py --clear-captchas' > ")
+                except EOFError:
+                    answer = "later"  # Nobody can type here (e.g. an unattended run)
+                if answer.strip().lower() != "later":
+                    on_captcha = "ask"
+                    visit_all(parking.ids())
+            if len(parking):
+                print(f"[!] {len(parking)} ID(s) are still parked in {parking.path}")
+            elif checkpoint and not args.clear_captchas and checkpoint.forget_if_complete(id_range):
+                print("[+] Every ID is finished, so the checkpoint was cleared for the next run")
 
     except KeyboardInterrupt:
         # If the user presses "Ctrl+C", stop things safely
@@ -287,7 +501,18 @@ def main():
     finally:
         # When all IDs are done (or if an error happens), close Chrome to clean up
         print("[+] Closing browser...")
-        driver.quit()
+        pool.quit()
+        if cache:
+            cache.close()
+        if checkpoint:
+            checkpoint.close()
+        if empty_ids:
+            empty_ids.close()
+        if changes:
+            report_changes(changes)
+            changes.close()
+        if page_counts:
+            print("[+] Pages seen: " + ", ".join(f"{kind} = {count}" for kind, count in sorted(page_counts.items())))
         print("Done. Check the output.csv file for your data.")
 
 # Set up the script to automatically run the 'main()' function when opened
@@ -1,12 +1,21 @@
+import argparse
 import csv
 import os
 import time
-import random
 from bs4 import BeautifulSoup
+from extraction import LabelIndex, SoupPage, compile_page_rules, classify_page, PAGE_VALID, PAGE_CAPTCHA
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException
+from rate_limiter import AdaptiveRateLimiter
+from browser import DEFAULT_BROWSER_SETTINGS, compile_readiness, resolve_driver_path, chrome_service, wait_until_ready, READY_TIMEOUT
+from checkpoint import Checkpoint, add_checkpoint_arguments, plan_run, STATUS_DONE, STATUS_EMPTY, STATUS_CAPTCHA, STATUS_ERROR
+from empty_ids import EmptyIdCache, add_empty_id_arguments, skip_known_empty
+
+# Default rules for the quick page check done before any parsing
+PAGE_RULES = compile_page_rules({})
+# Default conditions for "the page has finished loading"
+READINESS = compile_readiness({})
 
 def get_text_or_none(element):
     """Helper to extract stripped text if element exists."""
@@ -16,14 +25,18 @@ def get_text_or_none(element):
 
 def parse_html(html_content, course_id):
     """Parses the HTML content using BeautifulSoup (reuses V2 logic)."""
+    # Captcha and empty pages are recognised from the raw text, without parsing
+    page_kind = classify_page(html_content, PAGE_RULES)
+    if page_kind == PAGE_CAPTCHA:
+        return "CAPTCHA"
+    if page_kind != PAGE_VALID:
+        return None
+
     soup = BeautifulSoup(html_content, 'html.parser')
     
     # Check if page has content
     title_tag = soup.select_one('h5.card-title')
     if not title_tag:
-        # Check for CAPTCHA specific text if possible, or just assume empty
-        if "Validation request" in str(soup):
-            return "CAPTCHA"
         return None
 
     data = {}
@@ -39,20 +52,12 @@ def parse_html(html_content, course_id):
     else:
         data['Course Name'] = "N/A"
 
-    # Helper to find values based on labels
+    # Helper to find values based on labels: the page is walked once and every
+    # label below is then answered from that index (div.label -> div.value, then p -> p)
+    label_index = LabelIndex(SoupPage(soup))
+
     def find_value_by_label(label_text):
-        label_div = soup.find('div', class_='label', string=lambda t: t and label_text.lower() in t.lower())
-        if label_div:
-            value_div = label_div.find_next_sibling('div', class_='value')
-            if value_div:
-                return value_div.get_text(strip=True)
-        
-        label_p = soup.find(lambda tag: tag.name == 'p' and label_text.lower() == tag.get_text(strip=True).lower())
-        if label_p:
-           value_p = label_p.find_next_sibling('p')
-           if value_p:
-               return value_p.get_text(strip=True)
-        return "N/A"
+        return label_index.find(label_text, layouts=("div", "p"))
 
     data['Method'] = find_value_by_label("Method")
     data['Duration'] = find_value_by_label("Duration")
@@ -100,6 +105,10 @@ def parse_html(html_content, course_id):
 
 def main():
     print("--- Peneraju Selenium Scraper (V4) ---")
+    parser = argparse.ArgumentParser(description="Peneraju Selenium Scraper")
+    add_checkpoint_arguments(parser)
+    add_empty_id_arguments(parser)
+    args = parser.parse_args()
     try:
         start_id = int(input("Enter Start ID: "))
         end_id = int(input("Enter End ID: "))
@@ -113,7 +122,15 @@ def main():
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    # The matching Chrome driver is remembered, so it is only looked up online after a Chrome update
+    driver_path = resolve_driver_path(dict(DEFAULT_BROWSER_SETTINGS), base_dir=os.path.dirname(os.path.abspath(__file__)))
+    driver = webdriver.Chrome(service=chrome_service(driver_path), options=options)
+
+    # Notes of how every ID went, so a stopped run carries on where it stopped
+    checkpoint = Checkpoint.from_config(None, "scraper_selenium.py", base_dir=os.path.dirname(os.path.abspath(__file__)))
+    # IDs that had no course last time are skipped until they are due for a re-check
+    empty_ids = EmptyIdCache.from_config(None, "https://peneraju.org/course-details?id={var_id}",
+                                         base_dir=os.path.dirname(os.path.abspath(__file__)))
 
     try:
         # 1. Open Base URL so user can solve CAPTCHA
@@ -135,19 +152,33 @@ def main():
         output_file = "output.csv"
         file_exists = os.path.isfile(output_file)
 
+        # Carry on where an interrupted run stopped: skip IDs already finished or already in output.csv
+        id_range = plan_run(checkpoint, id_range, output_file, args.start_over)
+        id_range = skip_known_empty(empty_ids, id_range, args.recheck_empty)
+
         with open(output_file, "a", encoding="utf-8", newline='', buffering=1) as f:
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             if not file_exists:
                 writer.writeheader()
             
+            # Adaptive delay to look human: about one page every 7.5 s to start with,
+            # slowing down on CAPTCHAs or slow pages and speeding up while healthy
+            limiter = AdaptiveRateLimiter.from_config(None)
             for current_id in id_range:
                 url = f"https://peneraju.org/course-details?id={current_id}"
+                limiter.wait()
                 try:
+                    started = time.monotonic()
                     driver.get(url)
-                    # Small wait for render
-                    time.sleep(2) 
+                    # Wait for render: stops as soon as the title, a CAPTCHA or a fully loaded page shows up
+                    ready = wait_until_ready(driver, READINESS)
                     
                     html = driver.page_source
+                    limiter.record(latency=time.monotonic() - started,
+                                   captcha=classify_page(html, PAGE_RULES) == PAGE_CAPTCHA)
+                    if ready == READY_TIMEOUT:
+                        # A half-loaded page is an error, not an empty ID
+                        raise TimeoutException(f"page did not finish loading within {READINESS.timeout} seconds")
                     result = parse_html(html, current_id)
                     
                     if result == "CAPTCHA":
@@ -155,26 +186,46 @@ def main():
                         print("    Please solve it in the browser window.")
                         input("    Press ENTER to continue after solving > ")
                         # Retry logic could go here, but for now just move on or retry once
-                        result = parse_html(driver.page_source, current_id)
+                        if wait_until_ready(driver, READINESS) == READY_TIMEOUT:
+                            raise TimeoutException(f"page did not finish loading within {READINESS.timeout} seconds")
+                        html = driver.page_source
+                        result = parse_html(html, current_id)
                     
                     if result and result != "CAPTCHA":
                         print(f"[+] ID {current_id}: Found '{result['Course Name']}'")
                         writer.writerow(result)
+                        status = STATUS_DONE
+                    elif result == "CAPTCHA":
+                        print(f"[-] ID {current_id}: No info found")
+                        status = STATUS_CAPTCHA
+                    elif classify_page(html, PAGE_RULES) == PAGE_VALID:
+                        # Looks like a course page, but the title is missing: an error, not an empty ID
+                        print(f"[-] ID {current_id}: Course page could not be read")
+                        status = STATUS_ERROR
                     else:
                         print(f"[-] ID {current_id}: No info found")
+                        status = STATUS_EMPTY
 
                 except Exception as e:
                     print(f"[-] ID {current_id}: Error - {e}")
-                
-                # Random delay to look human
-                sleep_time = random.uniform(5, 10)
-                time.sleep(sleep_time)
+                    status = STATUS_ERROR
+                if checkpoint:
+                    checkpoint.mark(current_id, status)
+                if empty_ids:
+                    empty_ids.record(current_id, status)
+
+        if checkpoint and checkpoint.forget_if_complete(id_range):
+            print("[+] Every ID is finished, so the checkpoint was cleared for the next run")
 
     except KeyboardInterrupt:
         print("\nStopped by user.")
     finally:
         print("[+] Closing browser...")
         driver.quit()
+        if checkpoint:
+            checkpoint.close()
+        if empty_ids:
+            empty_ids.close()
         print("Done.")
 
 if __name__ == "__main__":
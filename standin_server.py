@@ -0,0 +1,101 @@
+# ==============================================================================
+# PENERAJU STAND-IN WEBSITE (try the scrapers without touching the real one)
+# ==============================================================================
+# A tiny website on your own computer that pretends to be peneraju.org:
+#   - the IDs you choose with --live get the saved course page (page_src.html),
+#   - every other ID gets an empty "No info found" page.
+# This lets you try out discovery.py (or a scraper's settings) as often as you
+# like, without waiting for, or bothering, the real website.
+#
+# Examples:
+#     python standin_server.py --live "1-300,520-610,2000"
+#     python discovery.py --url "http://127.0.0.1:8000/course-details?id={var_id}" --rate 50
+#
+#     # Only every third ID in 1-900 has a course, and each page takes 0.1 s:
+#     python standin_server.py --live 1-900 --every 3 --delay 0.1
+# ==============================================================================
+
+# ------------------------------------------------------------------------------
+# 1. IMPORTING REQUIRED TOOLKITS
+# ------------------------------------------------------------------------------
+import argparse     # Helps us read the options typed after the script name
+import os           # Helps us work with files and folders on your computer
+import time         # Helps us make pages slow on purpose, like a real website
+import urllib.parse # Helps us read the ID out of the link
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer # Helps us run a small website
+
+EMPTY_PAGE = b"<html><body><p>No info found</p></body></html>"
+
+# ------------------------------------------------------------------------------
+# 2. WHICH IDs HAVE A COURSE
+# ------------------------------------------------------------------------------
+
+def parse_live_ids(text, every=1):
+    """
+    Turns "1-300,520-610,2000" into the set of IDs with a course. With
+    'every' above 1, only every that-many-th ID of each stretch is kept.
+    """
+    live = set()
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        live.update(range(int(first), int(last or first) + 1, max(1, every)))
+    return live
+
+# ------------------------------------------------------------------------------
+# 3. RUNNING THE WEBSITE
+# ------------------------------------------------------------------------------
+
+def make_handler(page, live_ids, delay):
+    class StandInPage(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # Send each page at once instead of waiting ~40 ms
+
+        def do_GET(self):
+            query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+            try:
+                course_id = int(query.get("id", [""])[0])
+            except ValueError:
+                course_id = None
+            if delay:
+                time.sleep(delay)
+            body = page if course_id in live_ids else EMPTY_PAGE
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass    # Keep the screen quiet; there can be thousands of visits
+
+    return StandInPage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stand-in Peneraju website on your own computer")
+    parser.add_argument("--live", required=True, help='IDs with a course, for example "1-300,520-610,2000"')
+    parser.add_argument("--every", type=int, default=1, help="Only every this-many-th ID of each stretch has a course")
+    parser.add_argument("--page", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "page_src.html"),
+                        help="Saved course page to show (default: page_src.html)")
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds each page takes (default: 0)")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on (default: 8000)")
+    args = parser.parse_args()
+
+    with open(args.page, "rb") as f:
+        page = f.read()
+    live_ids = parse_live_ids(args.live, args.every)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(page, live_ids, args.delay))
+    print(f"[+] Stand-in website with {len(live_ids)} courses (highest ID {max(live_ids, default=None)}) "
+          f"at http://127.0.0.1:{args.port}/course-details?id={{var_id}}")
+    print("[+] Press Ctrl+C to stop it")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped by user.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# ==============================================================================
+# PENERAJU SHARED SETTINGS AND DATABASES (the parts every helper file uses)
+# ==============================================================================
+# Several helper files read their own part of config.kml ("cache",
+# "checkpoint", "http"...) and several keep a small SQLite database (the page
+# cache, the checkpoint, the memory of empty IDs, the fingerprints). They all
+# did it the same way, each with its own copy of the code. That code lives
+# here now:
+#   - section_settings : one part of config.kml, with defaults for anything missing
+#   - resolve_path     : a file name from config.kml, next to the scripts
+#   - SqliteStore      : a small database that many workers can share safely
+# ==============================================================================
+
+# ------------------------------------------------------------------------------
+# 1. IMPORTING REQUIRED TOOLKITS
+# ------------------------------------------------------------------------------
+import os           # Helps us work with files and folders on your computer
+import sqlite3      # Helps us keep small databases on disk
+import threading    # Helps us share one database safely between workers
+
+# ------------------------------------------------------------------------------
+# 2. SETTINGS
+# ------------------------------------------------------------------------------
+
+def section_settings(config, name, defaults):
+    """
+    Returns the 'name' part of config.kml (for example "cache"), with the
+    value from 'defaults' for anything missing. 'config' may be None.
+    """
+    settings = dict(defaults)
+    settings.update((config or {}).get(name) or {})
+    return settings
+
+
+def resolve_path(path, base_dir=None):
+    """Puts a relative file name from config.kml inside 'base_dir' (usually the scripts' folder)."""
+    if path and base_dir and not os.path.isabs(path):
+        return os.path.join(base_dir, path)
+    return path
+
+# ------------------------------------------------------------------------------
+# 3. THE SHARED DATABASE
+# ------------------------------------------------------------------------------
+
+class SqliteStore:
+    """
+    A small SQLite database that several threads can share. A store lists the
+    tables (and indexes) it needs in SCHEMA; they are created the first time.
+    Every query must be made while holding self._lock.
+    """
+
+    SCHEMA = ()
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._db:
+            for statement in self.SCHEMA:
+                self._db.execute(statement)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,72 @@
+# ==============================================================================
+# TESTS FOR discovery.py (against the stand-in website)
+# ==============================================================================
+# Starts standin_server.py on this computer with a few made-up stretches of
+# courses, runs the discovery on it, and checks the crawl plan it makes.
+#
+# Run them from the project folder with:
+#     python -m pytest -q
+# or, without pytest:
+#     python -m unittest discover tests
+# ==============================================================================
+
+import os
+import sys
+import threading
+import unittest
+from functools import partial
+from http.server import ThreadingHTTPServer
+
+import requests
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from discovery import DEFAULT_DISCOVERY_SETTINGS, discover, fetch_page_kind
+from extraction import compile_page_rules
+from rate_limiter import AdaptiveRateLimiter
+from standin_server import make_handler, parse_live_ids
+
+
+class DiscoveryOnStandInTest(unittest.TestCase):
+
+    def make_plan(self, live):
+        """Runs the discovery against a stand-in website whose courses are at 'live' IDs."""
+        with open(os.path.join(PROJECT_DIR, "page_src.html"), "rb") as f:
+            page = f.read()
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(page, parse_live_ids(live), 0))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        session = requests.Session()
+        self.addCleanup(session.close)
+        url_template = f"http://127.0.0.1:{server.server_address[1]}/course-details?id={{var_id}}"
+        # No need to be polite to our own stand-in website
+        limiter = AdaptiveRateLimiter(start_rate=1000, min_rate=1000, max_rate=1000)
+        fetch = partial(fetch_page_kind, session, url_template, compile_page_rules({}), limiter)
+        settings = dict(DEFAULT_DISCOVERY_SETTINGS, max_id=20000)
+        return discover(fetch, settings, seed=1)
+
+    def assert_plan_covers(self, plan, live):
+        live_ids = parse_live_ids(live)
+        self.assertEqual(plan["highest_live_id"], max(live_ids))
+        self.assertEqual(live_ids - set(plan["ids"]), set())
+
+    def test_courses_in_one_stretch(self):
+        self.assert_plan_covers(self.make_plan("100-150"), "100-150")
+
+    def test_few_courses_far_away(self):
+        self.assert_plan_covers(self.make_plan("5000-5003"), "5000-5003")
+
+    def test_courses_behind_a_hole(self):
+        self.assert_plan_covers(self.make_plan("1-300,520-610"), "1-300,520-610")
+
+    def test_no_courses(self):
+        plan = self.make_plan("30000")
+        self.assertIsNone(plan["highest_live_id"])
+        self.assertEqual(plan["ids"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()